@@ -3,12 +3,21 @@ import sqlite3
 import json
 import psycopg2
 
+# Requests borrow connections from the same pool as the ingestor (configured from the same .env),
+#       services/ingestor has to be on PYTHONPATH, app.py starts the API with it
+from connectionpool import db_pool
+
 app = Flask(__name__)
 
 @app.route("/init_database") 
 def get_data():
     return "Empty API Call"
 
+@app.route("/pool_stats")
+def pool_stats():
+    # Connection pool size and usage, for checking whether it is sized right
+    return jsonify(db_pool.stats())
+
 if __name__ == "__main__":
     print("✅ Starting Flask server on http://localhost:5000 ...")
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
@@ -2,6 +2,14 @@ from pathlib import Path
 import subprocess
 import requests
 import time
+import os
+
+def ingestor_env():
+    # Scripts and the API share the ingestor's modules (e.g. connectionpool), so they run with services/ingestor on PYTHONPATH
+    env = dict(os.environ)
+    ingestor_path = str(Path(__file__).resolve().parent / "ingestor")
+    env["PYTHONPATH"] = os.pathsep.join(path for path in (ingestor_path, env.get("PYTHONPATH")) if path)
+    return env
 
 def restart_docker(container):
     base = Path(__file__).parent.parent
@@ -20,7 +28,8 @@ def initialise_script(file_name, delay):
 
     subprocess.run(
         ["python3", file_name], 
-        cwd=scripts_dir
+        cwd=scripts_dir,
+        env=ingestor_env()
     )
 
 def start_api_server():
@@ -29,7 +38,8 @@ def start_api_server():
 
     subprocess.Popen(
         ["python3", "api.py"], 
-        cwd=scripts_dir
+        cwd=scripts_dir,
+        env=ingestor_env()
     )
 
     time.sleep(1)
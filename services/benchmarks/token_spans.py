@@ -0,0 +1,71 @@
+from pathlib import Path
+import argparse
+import re
+import sys
+import time
+
+# Benchmark for finding the paragraph and verse of every token in a single large chapter.
+#       Compares the old scan of every span for every token, against the single sweep in tokenstage.map_spans.
+#       Tokens are every run of non space characters, which is close enough to spaCy's for the offsets.
+# Run from this folder:
+#       python3 token_spans.py --verses 176 --runs 5
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "ingestor"))
+
+from tokenstage import build_chapter_text, map_spans
+
+def create_synthetic_paragraphs(verse_count):
+    # PSA 119 style chapter, each verse running across two poetry lines, with a footnote in the first
+    paragraphs = []
+    for verse in range(1, verse_count + 1):
+        verse_ref = f"PSA 119:{verse}"
+        paragraphs.append((len(paragraphs) + 1, f"""<para style="q1"><verse number="{verse}" style="v" sid="{verse_ref}"/>Blessed are those whose ways are blameless,"""
+            f"""<note caller="+" style="f"><char style="fr">119:{verse} </char><char style="ft">Or perfect</char></note></para>""", True))
+        paragraphs.append((len(paragraphs) + 1, f"""<para style="q2">who walk according to the law of the Lord.<verse eid="{verse_ref}"/></para>""", True))
+    return paragraphs
+
+def legacy_map_spans(offsets, spans):
+    # Previous Chapter.createTokens logic, every span checked for every token
+    mapped = []
+    for token_pos in offsets:
+        token_paragraph_id = None
+        token_verse_ref = None
+        token_verse_offset = None
+
+        for start, end, para_id, verse_ref, verse_start in spans:
+            if start <= token_pos < end:
+                token_paragraph_id = para_id
+                token_verse_ref = verse_ref
+                token_verse_offset = verse_start + token_pos - start if verse_start != None else None
+
+        mapped.append((token_paragraph_id, token_verse_ref, token_verse_offset))
+    return mapped
+
+def time_runs(function, runs):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per chapter token to paragraph/verse mapping benchmark")
+    parser.add_argument("--verses", type=int, default=176)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    chapter_text, spans, notes = build_chapter_text(create_synthetic_paragraphs(args.verses))
+    offsets = [match.start() for match in re.finditer(r"\S+", chapter_text)]
+    print(f"Synthetic chapter: {args.verses} verses, {len(spans)} spans, {len(offsets)} tokens")
+
+    legacy_time, legacy = time_runs(lambda: legacy_map_spans(offsets, spans), args.runs)
+    sweep_time, sweep = time_runs(lambda: map_spans(offsets, spans), args.runs)
+
+    print(f"Before (every span):       {legacy_time * 1000:9.1f} ms per chapter")
+    print(f"After (single sweep):      {sweep_time * 1000:9.1f} ms per chapter")
+    print(f"Speed up:                  {legacy_time / sweep_time:9.1f}x")
+
+    # Both have to find the same paragraph and verse for every token
+    assert legacy == sweep
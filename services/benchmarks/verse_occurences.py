@@ -0,0 +1,107 @@
+from bs4 import BeautifulSoup
+from pathlib import Path
+import argparse
+import re
+import sys
+import time
+
+# Benchmark for extracting verse occurences (text + xml) from a single large chapter.
+#       Compares the old per-verse regex over the whole chapter, against the single pass USXParser.
+# Run from this folder:
+#       python3 verse_occurences.py --verses 176 --runs 5
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "ingestor"))
+
+from usxparser import USXParser
+
+versetext_styles = {"p": True, "q1": True, "q2": True, "s1": False}
+
+def create_synthetic_book(verse_count):
+    # PSA 119 style chapter, verses running across poetry lines, with footnotes and headings every 8 verses
+    book = """<?xml version="1.0" encoding="utf-8"?>\n<usx version="3.0">\n"""
+    book += """<book code="PSA" style="id">Psalms</book>\n"""
+    book += """<chapter number="119" style="c" sid="PSA 119"/>\n"""
+
+    for verse in range(1, verse_count + 1):
+        verse_ref = f"PSA 119:{verse}"
+        if verse % 8 == 1:
+            book += f"""<para style="s1">Section {verse // 8 + 1}</para>\n"""
+        book += f"""<para style="q1"><verse number="{verse}" style="v" sid="{verse_ref}"/>Blessed are those whose ways are blameless,"""
+        book += f"""<note caller="+" style="f"><char style="fr">119:{verse} </char><char style="ft">Or perfect</char></note></para>\n"""
+        book += f"""<para style="q2">who walk according to the law of the Lord.<verse eid="{verse_ref}"/></para>\n"""
+
+    book += """<chapter eid="PSA 119"/>\n</usx>"""
+    return book
+
+def legacy_chapter_text(book_string, chapter_ref):
+    # Previous Book.createTextChapters logic for a single chapter
+    book_xml = BeautifulSoup(book_string, "xml")
+    start_tag = book_xml.find("chapter", sid=chapter_ref)
+    end_tag = book_xml.find("chapter", eid=chapter_ref)
+    chapter_found = re.search(f"{start_tag}.*{end_tag}", str(book_xml), re.DOTALL)
+    return """<usx version="3.0">\n""" + chapter_found.group(0) + "\n</usx>"
+
+def legacy_verse_occurences(chapter_text):
+    # Previous Verse.getVerseAndNoteXML + Verse.getVerseText, with the styles query replaced by a dict lookup
+    chapter_xml = BeautifulSoup(chapter_text, "xml")
+    occurences = []
+
+    for verse in chapter_xml.find_all("verse"):
+        verse_ref = verse.get("sid")
+        if not verse_ref:
+            continue
+
+        start_tag = chapter_xml.find("verse", sid=verse_ref)
+        end_tag = chapter_xml.find("verse", eid=verse_ref)
+        para_tag = str(start_tag.find_parent("para")).split(">")[0] + ">"
+
+        verse_found = re.search(f"{start_tag}.*{end_tag}", str(chapter_xml), re.DOTALL)
+        verse_xml = para_tag + "\n" + (verse_found.group(0) if verse_found != None else "") + "\n</para>"
+
+        temp_verse_xml = BeautifulSoup(verse_xml, "xml")
+        for para in temp_verse_xml.find_all("para"):
+            if not versetext_styles.get(para.get("style")):
+                para.decompose()
+                continue
+            for note in para.find_all("note"):
+                note.decompose()
+
+        occurences.append((verse_ref, temp_verse_xml.get_text().strip(), verse_xml))
+
+    return occurences
+
+def single_pass_verse_occurences(book_string):
+    occurences = []
+    for usx_chapter in USXParser(book_string).chapters():
+        for usx_verse in usx_chapter.verses:
+            occurences.append((usx_verse.verse_ref, usx_verse.getText(versetext_styles), usx_verse.xml))
+    return occurences
+
+def time_runs(function, runs):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per chapter verse occurence extraction benchmark")
+    parser.add_argument("--verses", type=int, default=176)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    book_string = create_synthetic_book(args.verses)
+    print(f"Synthetic chapter: {args.verses} verses, {len(book_string)} characters")
+
+    legacy_time, legacy = time_runs(lambda: legacy_verse_occurences(legacy_chapter_text(book_string, "PSA 119")), args.runs)
+    single_pass_time, single_pass = time_runs(lambda: single_pass_verse_occurences(book_string), args.runs)
+
+    print(f"Before (regex per verse):  {legacy_time * 1000:9.1f} ms per chapter")
+    print(f"After (single pass):       {single_pass_time * 1000:9.1f} ms per chapter")
+    print(f"Speed up:                  {legacy_time / single_pass_time:9.1f}x")
+
+    # Sanity check both produce the same verses (legacy text stops at the first paragraph boundary a verse crosses,
+    #       since the regex slice isn't balanced xml, so only the verse refs are compared)
+    assert [verse[0] for verse in legacy] == [verse[0] for verse in single_pass]
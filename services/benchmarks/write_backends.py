@@ -0,0 +1,98 @@
+from contextlib import redirect_stdout
+from pathlib import Path
+import argparse
+import io
+import sys
+import time
+
+# Benchmark for writing an imported book to Postgres with psycopg2 against psycopg 3 (pipeline mode + binary COPY).
+#       Needs a database set up with init_database.py (books, chapters, verses and styles), every run is rolled back.
+#       Pipelining saves a round trip per statement, so the gap grows with the latency to the database.
+# Run from this folder:
+#       python3 write_backends.py --book PSA --chapters 20 --runs 5
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "ingestor"))
+
+from connectionpool import ConnectionPool
+from writebuffer import WriteBuffer
+from styleregistry import StyleRegistry
+from strongscache import StrongsCache
+from book import Book
+
+def create_synthetic_book(cur, book_code, chapter_count):
+    # One paragraph per verse of the versification, each with a tagged word and a footnote
+    cur.execute("""
+        SELECT chapter_ref, verse_ref FROM bible.verses
+        WHERE chapter_ref IN (SELECT chapter_ref FROM bible.chapters WHERE book_code = %s)
+        ORDER BY id;
+    """, (book_code,))
+
+    chapters = {}
+    for chapter_ref, verse_ref in cur.fetchall():
+        chapters.setdefault(chapter_ref, []).append(verse_ref)
+    chapters = dict(list(chapters.items())[:chapter_count])
+
+    book = """<?xml version="1.0" encoding="utf-8"?>\n<usx version="3.0">\n"""
+    book += f"""<book code="{book_code}" style="id">{book_code}</book>\n"""
+    for chapter_ref, verse_refs in chapters.items():
+        book += f"""<chapter number="{chapter_ref.split(" ")[1]}" style="c" sid="{chapter_ref}"/>\n"""
+        for number, verse_ref in enumerate(verse_refs, start=1):
+            book += f"""<para style="p"><verse number="{number}" style="v" sid="{verse_ref}"/>In the <char style="w" strong="H7225">beginning</char>"""
+            book += f"""<note caller="+" style="f"><char style="fr">{number} </char><char style="ft">Or first</char></note> was the word.<verse eid="{verse_ref}"/></para>\n"""
+        book += f"""<chapter eid="{chapter_ref}"/>\n"""
+    book += "</usx>"
+
+    return book, len(chapters), sum(len(verse_refs) for verse_refs in chapters.values())
+
+def import_book(conn, book_code, book_usx):
+    # Same path as MinioUSXUpload.create_book, in a translation that only exists for this run
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO bible.translationinfo (dbl_id) VALUES ('benchmark') ON CONFLICT (dbl_id) DO NOTHING;
+    """)
+    cur.execute("""
+        INSERT INTO bible.translations (dbl_id, agreement_id) VALUES ('benchmark', 'benchmark') RETURNING id;
+    """)
+    translation_id = cur.fetchone()[0]
+    cur.execute("""
+        INSERT INTO bible.booktofile (book_code, translation_id) VALUES (%s, %s) RETURNING id;
+    """, (book_code, translation_id))
+    book_map_id = cur.fetchone()[0]
+
+    with redirect_stdout(io.StringIO()):
+        styles = StyleRegistry().load(cur)
+        strongs = StrongsCache().load(cur) # Strongs added by an earlier run were rolled back
+        Book(None, translation_id, book_map_id, None, book_usx, conn, WriteBuffer(conn), styles, strongs)
+
+def time_runs(pool, book_code, book_usx, runs):
+    timings = []
+    conn = pool.getconn()
+    for _ in range(runs):
+        start = time.perf_counter()
+        import_book(conn, book_code, book_usx)
+        timings.append(time.perf_counter() - start)
+        conn.rollback()
+    pool.putconn(conn)
+    pool.closeall()
+    return min(timings)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Book write benchmark, psycopg2 against psycopg 3")
+    parser.add_argument("--book", default="PSA")
+    parser.add_argument("--chapters", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    psycopg2_pool = ConnectionPool(1, 1, backend="psycopg2")
+    psycopg3_pool = ConnectionPool(1, 1, backend="psycopg")
+
+    with psycopg2_pool.connection() as conn:
+        book_usx, chapter_count, verse_count = create_synthetic_book(conn.cursor(), args.book, args.chapters)
+    print(f"Synthetic book: {args.book}, {chapter_count} chapters, {verse_count} verses")
+
+    psycopg2_time = time_runs(psycopg2_pool, args.book, book_usx, args.runs)
+    psycopg3_time = time_runs(psycopg3_pool, args.book, book_usx, args.runs)
+
+    print(f"psycopg2:                  {psycopg2_time * 1000:9.1f} ms per book")
+    print(f"psycopg 3 (pipelined):     {psycopg3_time * 1000:9.1f} ms per book")
+    print(f"Speed up:                  {psycopg2_time / psycopg3_time:9.1f}x")
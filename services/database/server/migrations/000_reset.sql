@@ -3,6 +3,7 @@ DROP TABLE IF EXISTS Languages CASCADE;
 DROP TABLE IF EXISTS Translations CASCADE;
 DROP TABLE IF EXISTS TranslationInfo CASCADE;
 DROP TABLE IF EXISTS TranslationRelationships CASCADE;
+DROP TABLE IF EXISTS IngestJobs CASCADE;
 
 DROP TABLE IF EXISTS Users CASCADE;
 DROP TABLE IF EXISTS Sources CASCADE;
@@ -12,6 +13,7 @@ DROP TABLE IF EXISTS Properties CASCADE;
 
 DROP TABLE IF EXISTS Books CASCADE;
 DROP TABLE IF EXISTS BookToFile CASCADE;
+DROP TABLE IF EXISTS BookCheckpoints CASCADE;
 DROP TABLE IF EXISTS BookGroups CASCADE;
 DROP TABLE IF EXISTS BookToGroup CASCADE;
 DROP TABLE IF EXISTS BookGroupNames CASCADE;
@@ -36,6 +38,7 @@ DROP TABLE IF EXISTS Quotes CASCADE;
 DROP TABLE IF EXISTS EntityOccurence CASCADE;
 DROP TABLE IF EXISTS StrongsOccurence CASCADE;
 
+DROP TABLE IF EXISTS Llemas CASCADE;
 DROP TABLE IF EXISTS Tokens CASCADE;
 
 DROP TABLE IF EXISTS UserNotes CASCADE;
@@ -0,0 +1,59 @@
+-- Secondary indexes for the foreign keys and lookups the ingestor and readers use, Postgres only indexes
+--      primary keys and UNIQUEs by itself. Every index is IF NOT EXISTS, so running this again rebuilds
+--      anything dropped for a bulk load (see services/ingestor/ingestindexes.py).
+
+-- ================================================== Used while importing ==================================================
+
+-- Reusing a book's booktofile row on a rerun (MinioUSXUpload.get_book_map) and clear_book
+CREATE INDEX IF NOT EXISTS idx_booktofile_translation_book ON bible.booktofile (translation_id, book_code);
+
+-- Chapters of a book (clear_book), and a chapter of a book for readers
+CREATE INDEX IF NOT EXISTS idx_chapteroccurences_book_map_chapter ON bible.chapteroccurences (book_map_id, chapter_ref);
+
+-- Files already stored for a bundle, looked up by path prefix (MinioUSXUpload.load_existing_files)
+CREATE INDEX IF NOT EXISTS idx_files_bucket_path ON bible.files (bucket, file_path text_pattern_ops);
+
+-- Paragraphs and verses of a chapter, for clear_book and for reading a chapter in order
+CREATE INDEX IF NOT EXISTS idx_paragraphs_chapter_occ ON bible.paragraphs (chapter_occ_id);
+CREATE INDEX IF NOT EXISTS idx_verseoccurences_chapter_occ_verse ON bible.verseoccurences (chapter_occ_id, verse_ref);
+
+-- Deleting a paragraph or token checks nothing still references it, most rows have no parent so only those that do are indexed
+CREATE INDEX IF NOT EXISTS idx_paragraphs_parent_para ON bible.paragraphs (parent_para) WHERE parent_para IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_tokens_head_token ON bible.tokens (head_token_id) WHERE head_token_id IS NOT NULL;
+
+-- Rows clear_book removes by paragraph or verse occurence
+CREATE INDEX IF NOT EXISTS idx_versestoparagraphs_paragraph ON bible.versestoparagraphs (paragraph_id);
+CREATE INDEX IF NOT EXISTS idx_tokens_paragraph ON bible.tokens (paragraph_id);
+CREATE INDEX IF NOT EXISTS idx_occurences_paragraph ON bible.occurences (paragraph_id);
+CREATE INDEX IF NOT EXISTS idx_occurences_verse_occ ON bible.occurences (verse_occ_id);
+
+-- Quotes of a book's quote occurences (TokenStage.clearBook and clear_book)
+CREATE INDEX IF NOT EXISTS idx_quotes_quote_start ON bible.quotes (quote_start);
+CREATE INDEX IF NOT EXISTS idx_quotes_quote_end ON bible.quotes (quote_end) WHERE quote_end IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_quotes_parent_quote ON bible.quotes (parent_quote) WHERE parent_quote IS NOT NULL;
+
+-- Notes of a book file, replaced together
+CREATE INDEX IF NOT EXISTS idx_translationfootnotes_file ON bible.translationfootnotes (file_id);
+CREATE INDEX IF NOT EXISTS idx_translationrefnotes_file ON bible.translationrefnotes (file_id);
+
+-- Strongs of a book of a translation written before strongsoccurence.paragraph_id, clear_book matches verse_ref by prefix ('GEN %')
+CREATE INDEX IF NOT EXISTS idx_strongsoccurence_translation_verse ON bible.strongsoccurence (translation_id, verse_ref text_pattern_ops);
+
+-- Excluded verses are replaced per translation (MinioUSXUpload.createExcludedVerses)
+CREATE INDEX IF NOT EXISTS idx_excludedverses_translation ON bible.excludedverses (translation_id);
+
+-- ================================================== Only used by readers ==================================================
+
+-- Nothing in the ingestor reads through these, so a bulk load can drop them and build them once at the end
+
+-- A verse across every translation
+CREATE INDEX IF NOT EXISTS idx_verseoccurences_verse ON bible.verseoccurences (verse_ref);
+
+-- Paragraphs a verse is in
+CREATE INDEX IF NOT EXISTS idx_versestoparagraphs_verse_paragraph ON bible.versestoparagraphs (verse_ref, paragraph_id);
+
+-- Every occurence of a strongs code, optionally within a translation
+CREATE INDEX IF NOT EXISTS idx_strongsoccurence_code_translation_verse ON bible.strongsoccurence (strong_code, translation_id, verse_ref);
+
+-- Tokens of a verse
+CREATE INDEX IF NOT EXISTS idx_tokens_verse_paragraph ON bible.tokens (verse_ref, paragraph_id);
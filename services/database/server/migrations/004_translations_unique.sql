@@ -0,0 +1,13 @@
+-- A translation is one row per (dbl_id, agreement_id), a new revision updates that row's revision and files
+--      (MinioUSXUpload.check_files). dataaccess.get_translation gets-or-creates it with
+--      ON CONFLICT (dbl_id, agreement_id), which needs a unique constraint on exactly those columns.
+--      The revision can't be part of it, since it is only known once the bundle is read.
+
+ALTER TABLE bible.translations DROP CONSTRAINT IF EXISTS translations_dbl_id_agreement_id_revision_key;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'translations_dbl_id_agreement_id_key') THEN
+        ALTER TABLE bible.translations ADD CONSTRAINT translations_dbl_id_agreement_id_key UNIQUE (dbl_id, agreement_id);
+    END IF;
+END $$;
@@ -0,0 +1,21 @@
+-- Downloaded translations waiting to be ingested (services/ingestor/ingestjobs.py), for databases created
+--      before bible.ingestjobs was added to v1_schema.sql
+
+CREATE TABLE IF NOT EXISTS bible.ingestjobs (
+    id                  SERIAL PRIMARY KEY,
+    translation_id      INT,
+    dbl_id              TEXT,
+    agreement_id        TEXT,
+    medium              TEXT,
+    location            TEXT, -- Downloaded ZIP or folder, must be reachable by every worker
+    source_url          TEXT,
+    state               TEXT DEFAULT 'downloaded', -- downloaded | ingesting | uploaded | parsed | failed
+    attempts            INT DEFAULT 0,
+    last_error          TEXT,
+    worker              TEXT, -- Worker that last claimed the job
+    created_at          TIMESTAMP DEFAULT now(),
+    updated_at          TIMESTAMP DEFAULT now(),
+    UNIQUE(dbl_id, agreement_id),
+    CHECK (state IN ('downloaded', 'ingesting', 'uploaded', 'parsed', 'failed')),
+    FOREIGN KEY (translation_id) REFERENCES bible.translations (id) ON DELETE CASCADE
+);
@@ -0,0 +1,26 @@
+-- Resumable imports (services/ingestor/bookcheckpoints.py), for databases created before translations.imported_at
+--      and bible.bookcheckpoints were added to v1_schema.sql
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'bible' AND table_name = 'translations' AND column_name = 'imported_at'
+    ) THEN
+        ALTER TABLE bible.translations ADD COLUMN imported_at TIMESTAMP;
+
+        -- Translations from before this were skipped once they existed, so they are kept as already imported
+        --      instead of being resumed
+        UPDATE bible.translations SET imported_at = now();
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS bible.bookcheckpoints (
+    translation_id  INT,
+    book_code       TEXT,
+    etag            TEXT, -- etag of the USX file the book was imported from
+    completed_at    TIMESTAMP DEFAULT now(),
+    PRIMARY KEY (translation_id, book_code),
+    FOREIGN KEY (translation_id) REFERENCES bible.translations (id) ON DELETE CASCADE,
+    FOREIGN KEY (book_code) REFERENCES bible.books (code)
+);
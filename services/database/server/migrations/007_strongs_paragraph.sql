@@ -0,0 +1,8 @@
+-- Links every strongs occurence to its paragraph, so clear_book can remove a book's strongs along with its
+--      paragraphs, including words outside of any verse (verse_ref NULL). Rows written before this keep
+--      paragraph_id NULL and are still removed by verse_ref.
+
+ALTER TABLE bible.strongsoccurence ADD COLUMN IF NOT EXISTS paragraph_id INT REFERENCES bible.paragraphs (id);
+
+-- Strongs of a book's paragraphs (clear_book)
+CREATE INDEX IF NOT EXISTS idx_strongsoccurence_paragraph ON bible.strongsoccurence (paragraph_id);
@@ -0,0 +1,21 @@
+-- Lemmas per language (services/ingestor/lemmacache.py), for databases created before bible.llemas was added to
+--      v1_schema.sql. tokens.llema_id already existed, it now references bible.llemas.
+
+CREATE TABLE IF NOT EXISTS bible.llemas (
+    id                  SERIAL PRIMARY KEY,
+    text                TEXT,
+    language_id         INT,
+    UNIQUE(text, language_id),
+    FOREIGN KEY (language_id) REFERENCES bible.languages (id)
+);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'tokens_llema_id_fkey') THEN
+        -- Ids written before there was a lemma table don't point at anything, tokenstage.py fills them in again
+        UPDATE bible.tokens SET llema_id = NULL
+        WHERE llema_id IS NOT NULL AND llema_id NOT IN (SELECT id FROM bible.llemas);
+
+        ALTER TABLE bible.tokens ADD CONSTRAINT tokens_llema_id_fkey FOREIGN KEY (llema_id) REFERENCES bible.llemas (id);
+    END IF;
+END $$;
@@ -109,7 +109,8 @@ CREATE TABLE IF NOT EXISTS bible.translations (
     ldml_file           INT,
     versification_file  INT,
     style_file          INT,
-	UNIQUE(dbl_id, agreement_id, revision),
+    imported_at         TIMESTAMP, -- Set once every book is imported, until then a rerun resumes the import
+	UNIQUE(dbl_id, agreement_id), -- A new revision updates the row, lets importers get-or-create it in a single statement
 	FOREIGN KEY (dbl_id) REFERENCES bible.translationinfo (dbl_id),
     FOREIGN KEY (license_file) REFERENCES bible.files (id),
     FOREIGN KEY (metadata_file) REFERENCES bible.files (id),
@@ -130,6 +131,27 @@ CREATE TABLE IF NOT EXISTS bible.translationrelationships (
     -- FOREIGN KEY (to_translation) REFERENCES bible.translations (dbl_id)
 );
 
+-- Downloaded translations waiting to be ingested, claimed by ingest workers with FOR UPDATE SKIP LOCKED
+-- DROP TABLE IF EXISTS bible.ingestjobs;
+CREATE TABLE IF NOT EXISTS bible.ingestjobs (
+    id                  SERIAL PRIMARY KEY,
+    translation_id      INT,
+    dbl_id              TEXT,
+    agreement_id        TEXT,
+    medium              TEXT,
+    location            TEXT, -- Downloaded ZIP or folder, must be reachable by every worker
+    source_url          TEXT,
+    state               TEXT DEFAULT 'downloaded', -- downloaded | ingesting | uploaded | parsed | failed
+    attempts            INT DEFAULT 0,
+    last_error          TEXT,
+    worker              TEXT, -- Worker that last claimed the job
+    created_at          TIMESTAMP DEFAULT now(),
+    updated_at          TIMESTAMP DEFAULT now(),
+    UNIQUE(dbl_id, agreement_id),
+    CHECK (state IN ('downloaded', 'ingesting', 'uploaded', 'parsed', 'failed')),
+    FOREIGN KEY (translation_id) REFERENCES bible.translations (id) ON DELETE CASCADE
+);
+
 -- ================================================== bible.books ==================================================
 
 -- DROP TABLE IF EXISTS bible.books;
@@ -152,6 +174,19 @@ CREATE TABLE IF NOT EXISTS bible.booktofile (
     FOREIGN KEY (file_id) REFERENCES bible.files (id) ON DELETE CASCADE
 );
 
+-- Books of a translation that finished importing, written in the same transaction as the book itself.
+--      A rerun skips books with a checkpoint for the same file etag and redoes the rest.
+-- DROP TABLE IF EXISTS bible.bookcheckpoints;
+CREATE TABLE IF NOT EXISTS bible.bookcheckpoints (
+    translation_id  INT,
+    book_code       TEXT,
+    etag            TEXT, -- etag of the USX file the book was imported from
+    completed_at    TIMESTAMP DEFAULT now(),
+    PRIMARY KEY (translation_id, book_code),
+    FOREIGN KEY (translation_id) REFERENCES bible.translations (id) ON DELETE CASCADE,
+    FOREIGN KEY (book_code) REFERENCES bible.books (code)
+);
+
 -- DROP TABLE IF EXISTS bible.bookgroups;
 CREATE TABLE IF NOT EXISTS bible.bookgroups (
     id              SERIAL PRIMARY KEY,
@@ -300,9 +335,11 @@ CREATE TABLE IF NOT EXISTS bible.strongsoccurence (
     text            TEXT,
     xml             TEXT,
     strong_code     TEXT,
+    paragraph_id    INT, -- Paragraph the word is in, verse_ref is NULL for words after the last verse of a chapter
     FOREIGN KEY (translation_id) REFERENCES bible.translations (id),
     FOREIGN KEY (verse_ref) REFERENCES bible.verses (verse_ref),
-    FOREIGN KEY (strong_code) REFERENCES bible.strongs (code)
+    FOREIGN KEY (strong_code) REFERENCES bible.strongs (code),
+    FOREIGN KEY (paragraph_id) REFERENCES bible.paragraphs (id)
 );
 
 -- DROP TABLE IF EXISTS bible.entities;
@@ -351,6 +388,16 @@ CREATE TABLE IF NOT EXISTS bible.entityoccurence (
 
 -- ================================================== [] ==================================================
 
+-- Lemmas per language, shared by every translation in that language
+-- DROP TABLE IF EXISTS bible.llemas;
+CREATE TABLE IF NOT EXISTS bible.llemas (
+    id                  SERIAL PRIMARY KEY,
+    text                TEXT,
+    language_id         INT,
+    UNIQUE(text, language_id),
+    FOREIGN KEY (language_id) REFERENCES bible.languages (id)
+);
+
 -- Only storing important bible.tokens
 -- DROP TABLE IF EXISTS bible.tokens;
 CREATE TABLE IF NOT EXISTS bible.tokens (
@@ -367,6 +414,7 @@ CREATE TABLE IF NOT EXISTS bible.tokens (
     is_alpha            BOOLEAN,
     is_punct            BOOLEAN,
     like_num            BOOLEAN,
+    FOREIGN KEY (llema_id) REFERENCES bible.llemas (id),
     FOREIGN KEY (paragraph_id) REFERENCES bible.paragraphs (id),
     FOREIGN KEY (verse_ref) REFERENCES bible.verses (verse_ref),
     FOREIGN KEY (head_token_id) REFERENCES bible.tokens (id)
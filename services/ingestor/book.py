@@ -1,65 +1,82 @@
-from bs4 import BeautifulSoup
-import pathlib
-import re
-
 import psycopg2
 
 from chapter import Chapter
+from usxparser import USXParser
+from pgbackend import pipeline
 
 # Changing since will only be relevant for text anyway
 class Book:
-    def __init__(self, language_id, translation_id, book_map_id, file_id, book_string, db_conn):
+    def __init__(self, language_id, translation_id, book_map_id, file_id, book_usx, db_conn, write_buffer, styles, strongs):
         self.language_id = language_id
         self.translation_id = translation_id
         self.book_map_id = book_map_id
         self.file_id = file_id
-        self.book_xml = BeautifulSoup(book_string, "xml")
+        self.book_usx = book_usx # Raw USX, or a list of USXChapter already parsed with parse_book
 
         # Adds a database connection
         self.conn = db_conn
         self.cur = self.conn.cursor()
+        self.write_buffer = write_buffer
+        self.styles = styles # StyleRegistry, loaded once per import
+        self.strongs = strongs # StrongsCache, loaded once per import
+        self.failed_chapters = [] # Chapters rolled back because they couldn't be imported
 
         self.cur.execute("""
             SELECT book_code FROM bible.booktofile WHERE id = %s;
         """, (self.book_map_id,))
-        self.book_code = self.cur.fetchone()
-        
+        self.book_code = self.cur.fetchone()[0]
+
         self.createTextChapters()
 
-        self.conn.commit()
+        # Write anything still buffered for this book, the caller commits it together with the book's checkpoint
+        self.write_buffer.flush()
 
-    # Purpose is to split xml up into chapters, for token processing
+    # Purpose is to split xml up into chapters, for token processing
     def createTextChapters(self):
         additions = 0
         # Grab all chapter_refs for this particular book
         self.cur.execute("""
             SELECT chapter_ref FROM bible.chapters WHERE book_code=%s
         """, (self.book_code,))
-        all_chapters = self.cur.fetchall()
+        all_chapters = {chapter[0] for chapter in self.cur.fetchall()}
 
-        for chapter in all_chapters:
-            chapter_ref = chapter[0]
-            start_tag = self.book_xml.find("chapter", sid=chapter_ref)
-            end_tag = self.book_xml.find("chapter", eid=chapter_ref)
-
-            search_string = f"{start_tag}.*{end_tag}"
-            chapter_found = re.search(search_string, str(self.book_xml), re.DOTALL)
+        # Walks the book once, handing over each chapter as soon as its closing milestone is reached
+        usx_chapters = self.book_usx if isinstance(self.book_usx, list) else USXParser(self.book_usx).chapters()
 
+        for usx_chapter in usx_chapters:
             # In case of WLC for example, Malachi 4 doesn't exist, so skip over chapter
             #       if it doesn't exist for this book.
-            if chapter_found == None:
+            if usx_chapter.chapter_ref not in all_chapters:
                 continue
 
-            # Have to add encapsulating tags, since otherwise only first chapter tag, 
-            #       will be included when parsed as xml, ignoring the rest of the text
-            chapter_text = """<usx version="3.0">\n"""
-            chapter_text += chapter_found.group(0)
-            chapter_text += "\n</usx>"
+            if self.createChapter(usx_chapter):
+                additions += 1
 
-            # Create Chapter Classes
-            Chapter(self.language_id, self.translation_id, self.book_map_id, chapter_ref, chapter_text, self.conn)
-            additions += 1
-        
         if additions > 0:
             print(f"[{additions}] Chapters added for {self.book_code}")
-   
\ No newline at end of file
+        if self.failed_chapters:
+            print(f"⚠️ [{len(self.failed_chapters)}] Chapters failed for {self.book_code}: {', '.join(self.failed_chapters)}")
+
+    def createChapter(self, usx_chapter):
+        # Each chapter runs in a savepoint, so one bad chapter is rolled back on its own instead of losing the whole book.
+        #       Its rows have to reach the database before the savepoint is released, or a later flush could
+        #       write them outside of it. With psycopg 3 the whole chapter is pipelined, only waiting where an id is read back.
+        try:
+            with pipeline(self.conn):
+                self.cur.execute("SAVEPOINT chapter;")
+                Chapter(self.language_id, self.translation_id, self.book_map_id, usx_chapter, self.conn, self.write_buffer, self.styles, self.strongs)
+                self.write_buffer.flush()
+                self.cur.execute("RELEASE SAVEPOINT chapter;")
+        except Exception as e:
+            self.cur.execute("ROLLBACK TO SAVEPOINT chapter;")
+            self.write_buffer.discard()
+
+            # Strongs codes added by this chapter were rolled back too, so the cache has to be read again
+            self.strongs.invalidate()
+            self.strongs.load(self.cur)
+
+            self.failed_chapters.append(usx_chapter.chapter_ref)
+            print(f"❌ {usx_chapter.chapter_ref} rolled back: {e}")
+            return False
+
+        return True
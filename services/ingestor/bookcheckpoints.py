@@ -0,0 +1,75 @@
+# Per book progress of a translation import (bible.bookcheckpoints). A checkpoint is only written in the
+#       same transaction as the book's rows, so a book either has a checkpoint and all of its rows, or it gets
+#       cleared and imported again.
+
+def load_checkpoints(cur, translation_id):
+    # book_code => etag of the file each finished book was imported from
+    cur.execute("""
+        SELECT book_code, etag FROM bible.bookcheckpoints WHERE translation_id = %s;
+    """, (translation_id,))
+    return dict(cur.fetchall())
+
+def complete_book(cur, translation_id, book_code, etag):
+    cur.execute("""
+        INSERT INTO bible.bookcheckpoints (translation_id, book_code, etag) VALUES (%s, %s, %s)
+        ON CONFLICT (translation_id, book_code) DO UPDATE SET etag = EXCLUDED.etag, completed_at = now();
+    """, (translation_id, book_code, etag))
+
+def clear_book(cur, translation_id, book_code):
+    # Removes everything imported for a book of this translation (e.g. left behind by an import that died part
+    #       way through it), children first. Returns the number of chapters removed.
+    cur.execute("""
+        SELECT id FROM bible.chapteroccurences
+        WHERE book_map_id IN (SELECT id FROM bible.booktofile WHERE translation_id = %s AND book_code = %s);
+    """, (translation_id, book_code))
+    chapter_occ_ids = [row[0] for row in cur.fetchall()]
+
+    cur.execute("""
+        DELETE FROM bible.bookcheckpoints WHERE translation_id = %s AND book_code = %s;
+    """, (translation_id, book_code))
+    # Strongs are removed with their paragraphs below, only rows from before strongsoccurence.paragraph_id
+    #       have to be found by verse
+    cur.execute("""
+        DELETE FROM bible.strongsoccurence WHERE translation_id = %s AND paragraph_id IS NULL AND verse_ref LIKE %s;
+    """, (translation_id, book_code + " %"))
+    for notes_table in ("bible.translationfootnotes", "bible.translationrefnotes"):
+        cur.execute(f"""
+            DELETE FROM {notes_table}
+            WHERE file_id IN (SELECT file_id FROM bible.booktofile WHERE translation_id = %s AND book_code = %s);
+        """, (translation_id, book_code))
+
+    if not chapter_occ_ids:
+        return 0
+
+    cur.execute("""
+        SELECT id FROM bible.paragraphs WHERE chapter_occ_id = ANY(%s);
+    """, (chapter_occ_ids,))
+    paragraph_ids = [row[0] for row in cur.fetchall()]
+
+    cur.execute("""
+        DELETE FROM bible.strongsoccurence WHERE paragraph_id = ANY(%s);
+    """, (paragraph_ids,))
+    cur.execute("""
+        DELETE FROM bible.tokens WHERE paragraph_id = ANY(%s);
+    """, (paragraph_ids,))
+    cur.execute("""
+        DELETE FROM bible.quotes WHERE quote_start IN (SELECT id FROM bible.occurences WHERE paragraph_id = ANY(%s));
+    """, (paragraph_ids,))
+    cur.execute("""
+        DELETE FROM bible.occurences WHERE paragraph_id = ANY(%s)
+            OR verse_occ_id IN (SELECT id FROM bible.verseoccurences WHERE chapter_occ_id = ANY(%s));
+    """, (paragraph_ids, chapter_occ_ids))
+    cur.execute("""
+        DELETE FROM bible.versestoparagraphs WHERE paragraph_id = ANY(%s);
+    """, (paragraph_ids,))
+    cur.execute("""
+        DELETE FROM bible.paragraphs WHERE id = ANY(%s);
+    """, (paragraph_ids,))
+    cur.execute("""
+        DELETE FROM bible.verseoccurences WHERE chapter_occ_id = ANY(%s);
+    """, (chapter_occ_ids,))
+    cur.execute("""
+        DELETE FROM bible.chapteroccurences WHERE id = ANY(%s);
+    """, (chapter_occ_ids,))
+
+    return len(chapter_occ_ids)
@@ -0,0 +1,53 @@
+from pathlib import Path
+import shutil
+
+# Where the files of a DBL bundle are read from while importing it, paths are always relative to the bundle
+#       root (e.g. "release/USX_1/GEN.usx"), as written in metadata.xml.
+
+class FolderSource:
+    # An extracted bundle (or an audio download) on disk
+    keep_data = True # Reading is cheap, but only read each file once and keep it for parsing
+
+    def __init__(self, location, temporary=True):
+        self.location = Path(location)
+        self.name = self.location.name # Top folder of the bundle, same as ZipSource so object names match
+        self.temporary = temporary # Only temporary folders (downloads, extracted ZIPs) are deleted after the import
+
+    def exists(self, path):
+        return (self.location / path).exists()
+
+    def read(self, path):
+        return (self.location / path).read_bytes()
+
+    def cleanup(self):
+        if not self.temporary:
+            return
+
+        if self.location.is_dir():
+            shutil.rmtree(self.location, ignore_errors=True)  # delete folder + contents
+        elif self.location.is_file():
+            Path(self.location).unlink(missing_ok=True)
+
+class ZipSource:
+    # A bundle read straight out of its ZIP, nothing is extracted to disk
+    keep_data = False # Books are read again from the ZIP when parsed, so only the ones being worked on are in memory
+
+    def __init__(self, zip_file, top_folder):
+        self.zip = zip_file
+        self.name = top_folder
+        self.entries = set(zip_file.namelist())
+
+    def entry(self, path):
+        if self.name == None:
+            return path
+        return f"{self.name}/{path}"
+
+    def exists(self, path):
+        return self.entry(path) in self.entries
+
+    def read(self, path):
+        return self.zip.read(self.entry(path))
+
+    def cleanup(self):
+        # The ZIP itself is removed by whoever opened it
+        pass
@@ -0,0 +1,146 @@
+from psycopg2.pool import ThreadedConnectionPool
+from contextlib import contextmanager
+from pathlib import Path
+import threading
+import time
+import os
+
+from dotenv import load_dotenv
+
+# Automatically find the project root (folder containing .env)
+current = Path(__file__).resolve()
+for parent in current.parents:
+    if (parent / ".env").exists():
+        load_dotenv(parent / ".env")
+        break
+
+POSTGRES_USERNAME = os.getenv("POSTGRES_USERNAME")
+POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
+POSTGRES_DB = os.getenv("POSTGRES_DB")
+POSTGRES_HOST = os.getenv("POSTGRES_HOST")
+POSTGRES_PORT = os.getenv("POSTGRES_PORT")
+
+# psycopg2 keeps at most [min] connections open between uses, any more are closed when they are handed back.
+#       psycopg 3 (psycopg_pool) keeps [min] open and closes the rest once they have been idle for a while.
+POSTGRES_POOL_MIN = int(os.getenv("POSTGRES_POOL_MIN", "4"))
+POSTGRES_POOL_MAX = int(os.getenv("POSTGRES_POOL_MAX", "10"))
+
+# psycopg2 (default) or psycopg (3, pipelines the ingest writes, see pgbackend)
+POSTGRES_BACKEND = os.getenv("POSTGRES_BACKEND", "psycopg2")
+
+# One pool of Postgres connections per process, shared by the ingestor, scripts and the API, so each
+#       translation, worker thread or request reuses an open connection instead of setting up a new one.
+#       psycopg2's pool raises once every connection is taken, this one waits for a connection to come back.
+#       psycopg 3 connections come from psycopg_pool's ConnectionPool, only installed when that backend is used.
+
+class ConnectionPool:
+    def __init__(self, minconn=POSTGRES_POOL_MIN, maxconn=POSTGRES_POOL_MAX, backend=POSTGRES_BACKEND):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.backend = backend
+        self.pool = None # Only connects the first time a connection is needed
+        self.lock = threading.Lock()
+        self.available = threading.BoundedSemaphore(maxconn)
+
+        self.in_use = 0
+        self.idle = 0 # psycopg2 connections open but not handed out, psycopg_pool counts its own
+        self.checkouts = 0
+        self.waits = 0 # Checkouts that had to wait for a connection to be returned
+        self.wait_seconds = 0.0
+
+    def open(self):
+        with self.lock:
+            if self.pool == None:
+                settings = {
+                    "host": POSTGRES_HOST,
+                    "port": POSTGRES_PORT,
+                    "dbname": POSTGRES_DB,
+                    "user": POSTGRES_USERNAME,
+                    "password": POSTGRES_PASSWORD
+                }
+
+                if self.backend == "psycopg":
+                    from psycopg_pool import ConnectionPool as Psycopg3Pool
+
+                    self.pool = Psycopg3Pool(kwargs=settings, min_size=self.minconn, max_size=self.maxconn, open=True)
+                else:
+                    self.pool = ThreadedConnectionPool(self.minconn, self.maxconn, **settings)
+                    self.idle = self.minconn # Opened up front
+        return self.pool
+
+    def getconn(self):
+        pool = self.open()
+
+        if not self.available.acquire(blocking=False):
+            start = time.time()
+            self.available.acquire()
+            with self.lock:
+                self.waits += 1
+                self.wait_seconds += time.time() - start
+
+        try:
+            conn = pool.getconn()
+        except Exception:
+            self.available.release()
+            raise
+
+        with self.lock:
+            self.in_use += 1
+            self.checkouts += 1
+            if self.idle > 0:
+                self.idle -= 1 # Reused, psycopg2 only opens a new connection when none are idle
+        return conn
+
+    def putconn(self, conn):
+        # The pool rolls back anything left uncommitted before the connection is handed out again
+        if self.backend == "psycopg":
+            self.pool.putconn(conn)
+        else:
+            closed = conn.closed != 0
+            with self.lock:
+                # psycopg2 keeps the connection if fewer than [min] are idle, otherwise it is closed
+                if not closed and self.idle < self.minconn:
+                    self.idle += 1
+            self.pool.putconn(conn, close=closed)
+
+        with self.lock:
+            self.in_use -= 1
+        self.available.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def stats(self):
+        # Pool size and usage so far, e.g. for /pool_stats or the end of an import
+        with self.lock:
+            idle = self.idle # Connections open but not handed out
+            if self.backend == "psycopg" and self.pool != None:
+                idle = self.pool.get_stats()["pool_available"]
+
+            return {
+                "backend": self.backend,
+                "min": self.minconn,
+                "max": self.maxconn,
+                "in_use": self.in_use,
+                "idle": idle,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3)
+            }
+
+    def closeall(self):
+        if self.pool != None:
+            if self.backend == "psycopg":
+                self.pool.close()
+            else:
+                self.pool.closeall()
+            self.pool = None
+            self.idle = 0
+
+# Process wide pool
+db_pool = ConnectionPool()
@@ -0,0 +1,65 @@
+# Shared helpers for writing rows and getting their id back in a single statement,
+#       instead of an INSERT followed by SELECT currval(pg_get_serial_sequence(...)).
+
+def insert_returning_id(cur, table, values):
+    # values: {column: value} for a single new row
+    columns = list(values)
+
+    cur.execute(f"""
+        INSERT INTO {table} ({", ".join(columns)})
+        VALUES ({", ".join(["%s"] * len(columns))})
+        RETURNING id;
+    """, tuple(values.values()))
+    return cur.fetchone()[0]
+
+def get_or_create(cur, table, values, conflict_columns):
+    # Returns (id, created) for the row matching conflict_columns, creating it from values if it doesn't exist yet.
+    #       Needs a unique constraint on conflict_columns. The no-op DO UPDATE makes the existing row come back
+    #       from RETURNING, so two importers racing on the same key both get the same id without an extra lookup.
+    #       xmax is only 0 for a row this statement inserted.
+    columns = list(values)
+
+    cur.execute(f"""
+        INSERT INTO {table} ({", ".join(columns)})
+        VALUES ({", ".join(["%s"] * len(columns))})
+        ON CONFLICT ({", ".join(conflict_columns)}) DO UPDATE SET {conflict_columns[0]} = EXCLUDED.{conflict_columns[0]}
+        RETURNING id, (xmax = 0);
+    """, tuple(values.values()))
+    return cur.fetchone()
+
+def get_or_create_id(cur, table, values, conflict_columns):
+    return get_or_create(cur, table, values, conflict_columns)[0]
+
+def find_translation(cur, dbl_id, agreement_id):
+    # Returns the translation_id already used for this dbl_id/agreement_id, or None
+    cur.execute("""
+        SELECT id FROM bible.translations WHERE dbl_id = %s AND agreement_id = %s;
+    """, (dbl_id, str(agreement_id)))
+    row = cur.fetchone()
+    return row[0] if row != None else None
+
+def get_translation(cur, dbl_id, agreement_id):
+    # Returns the translation_id to import this dbl_id/agreement_id into, or -1 if it was already imported.
+    #       A translation that exists but never finished importing is returned again, so the import resumes.
+    agreement_id = str(agreement_id)
+
+    cur.execute("""
+        INSERT INTO bible.translationinfo (dbl_id) VALUES(%s)
+        ON CONFLICT (dbl_id) DO NOTHING;
+    """, (dbl_id,))
+
+    # Create a new entry and pass along the new id, in one statement so two importers can't both claim it
+    translation_id, created = get_or_create(cur, "bible.translations", {
+        "dbl_id": dbl_id,
+        "agreement_id": agreement_id
+    }, ("dbl_id", "agreement_id"))
+
+    # If the translation already exists, then quit processing this translation
+    if not created:
+        cur.execute("""
+            SELECT imported_at FROM bible.translations WHERE id = %s;
+        """, (translation_id,))
+        if cur.fetchone()[0] != None:
+            return -1
+
+    return translation_id # Return translation_id to link to
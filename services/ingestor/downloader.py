@@ -0,0 +1,171 @@
+from playwright.async_api import async_playwright
+from pathlib import Path
+import asyncio
+import os
+
+from miniousxupload import MinioUSXUpload
+
+# Downloads translations from DBL with several pages at once, while the translations already downloaded are
+#       being ingested. Pages each get their own browser context, all sharing the storage state (cookies) of a
+#       single log in. Finished downloads go on a bounded queue, so downloads stay at most [queue_size] ahead
+#       of ingesting and the disk doesn't fill up with ZIPs waiting to be processed.
+
+DBL_URL = "https://app.library.bible/"
+
+class AsyncDownloader:
+    def __init__(self, ingestor, translations, pages=4, queue_size=2, headless=False):
+        self.ingestor = ingestor # Ingestor that owns the database, minio client and settings
+        self.translations = translations # (translation_id, dbl_id, agreement_id) to download, already claimed
+        self.pages = pages
+        self.queue_size = queue_size
+        self.headless = headless
+
+    async def run(self):
+        work = asyncio.Queue()
+        for translation in self.translations:
+            work.put_nowait(translation)
+
+        downloads = asyncio.Queue(maxsize=self.queue_size)
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=self.headless)
+            storage_state = await self.log_in(browser)
+
+            consumer = asyncio.create_task(self.ingest_downloads(downloads))
+            producers = [
+                asyncio.create_task(self.download_translations(browser, storage_state, work, downloads))
+                for _ in range(min(self.pages, len(self.translations)))
+            ]
+
+            await asyncio.gather(*producers)
+            await downloads.put(None) # Nothing left to download, let the consumer finish
+            await consumer
+
+            await browser.close()
+
+    async def log_in(self, browser):
+        # Log in once, every page reuses the same session
+        context = await browser.new_context()
+        page = await context.new_page()
+
+        await page.goto(DBL_URL)
+        await page.wait_for_load_state("networkidle") # Wait until no network requests for ~500ms (are we being redirected to login?)
+
+        if await page.query_selector("input[name='email']"):
+            print("Need to log in")
+            await page.fill("input[name='email']", self.ingestor.dbl_username)
+            await page.fill("input[name='password']", self.ingestor.dbl_password)
+            await page.click("button#rememberMe")
+            await page.click("button:has-text('Sign in')")
+            await page.wait_for_url(DBL_URL)
+            print("✅ Succesful Log In")
+        else:
+            print("Already logged in")
+
+        storage_state = await context.storage_state()
+        await context.close()
+        return storage_state
+
+    async def download_translations(self, browser, storage_state, work, downloads):
+        context = await browser.new_context(accept_downloads=True, storage_state=storage_state)
+        page = await context.new_page()
+
+        while not work.empty():
+            translation_id, dbl_id, agreement_id = work.get_nowait()
+            try:
+                download = await self.download_translation(page, translation_id, dbl_id, agreement_id)
+            except Exception as e:
+                print(f"⚠️ Failed to download {dbl_id}-{agreement_id}: {e}")
+                continue
+
+            # Waits here while the ingest stage is [queue_size] downloads behind
+            await downloads.put(download)
+
+        await context.close()
+
+    async def download_translation(self, page, translation_id, dbl_id, agreement_id):
+        download_path = Path(self.ingestor.download_path)
+
+        # Go to the DBL translation page
+        url = DBL_URL + "content/" + dbl_id + "/download?agreementId=" + str(agreement_id)
+        await page.goto(url)
+        await page.wait_for_selector("button:has-text('Download')")
+
+        zip_button = await page.query_selector("button:has-text('Download ZIP')")
+        if zip_button:
+            async with page.expect_download() as download_info:
+                await page.click("button:has-text('Download ZIP')")
+            download = await download_info.value
+
+            new_path = download_path / download.suggested_filename
+            await download.save_as(new_path)
+            print(f"✅ Downloaded ZIP: {new_path}")
+
+            return ("text", new_path, url, translation_id, dbl_id, agreement_id)
+
+        print("⚠️ No ZIP button found, assuming audio download instead")
+        await self.expand_all_folders(page)
+
+        download_folder_name = f"audio-{dbl_id}-{agreement_id}"
+        file_buttons = await page.query_selector_all("button[aria-label^='Download']")
+
+        # Clicks have to happen one at a time, but every file then downloads in parallel
+        saves = []
+        for btn in file_buttons:
+            filename = (await btn.get_attribute("aria-label")).replace("Download ", "").strip()
+
+            book = filename.split(".")[0].split("_")[0]
+            folder_names = ["release", "audio", book]
+            if filename == "metadata.xml":
+                folder_names = []
+
+            folder_path = os.path.join(download_path / download_folder_name, *folder_names)
+            os.makedirs(folder_path, exist_ok=True)
+
+            async with page.expect_download() as download_info:
+                await btn.click()
+            download = await download_info.value
+            saves.append(download.save_as(os.path.join(folder_path, filename)))
+
+        await asyncio.gather(*saves)
+
+        new_path = download_path / download_folder_name
+        print(f"✅ Downloaded {len(file_buttons)} Audio Files: {new_path}")
+
+        return ("audio", new_path, url, translation_id, dbl_id, agreement_id)
+
+    async def expand_all_folders(self, page):
+        # Same as Ingestor.expand_all_folders, but waits for the page instead of sleeping a fixed time per click
+        while True:
+            expand_buttons = await page.query_selector_all("button[aria-label^='Expand ']")
+
+            if not expand_buttons:
+                # No more expandable folders found
+                break
+
+            print(f"Found {len(expand_buttons)} folders to expand...")
+
+            for btn in expand_buttons:
+                try:
+                    await btn.scroll_into_view_if_needed()
+                    await btn.click()
+                except Exception as e:
+                    print(f"⚠️ Failed to expand {await btn.get_attribute('aria-label')}: {e}")
+
+            # Allow nested folders to render before looking for more
+            await page.wait_for_load_state("networkidle")
+
+        print("✅ All folders expanded.")
+
+    async def ingest_downloads(self, downloads):
+        # Ingesting blocks (database, minio and parsing), so it runs in a thread while pages keep downloading
+        while True:
+            download = await downloads.get()
+            if download == None:
+                break
+
+            medium, new_path, url, translation_id, dbl_id, agreement_id = download
+            try:
+                await asyncio.to_thread(self.ingestor.ingest, medium, new_path, url, translation_id, dbl_id, agreement_id)
+            except Exception as e:
+                print(f"⚠️ Failed to ingest {dbl_id}-{agreement_id}: {e}")
@@ -0,0 +1,19 @@
+import hashlib
+
+# Works out the etag MinIO will give an object before it is uploaded, so unchanged files can be skipped.
+#       Objects uploaded in one request get the md5 of their data. Multipart uploads get the md5 of every
+#       part's md5 joined together, followed by "-<number of parts>".
+
+PART_SIZE = 5 * 1024 * 1024 # Smallest part MinIO allows, always passed to put_object so the parts line up
+
+def local_etag(file_data, part_size=PART_SIZE):
+    if len(file_data) <= part_size:
+        return hashlib.md5(file_data).hexdigest()
+
+    part_digests = b""
+    part_count = 0
+    for start in range(0, len(file_data), part_size):
+        part_digests += hashlib.md5(file_data[start:start + part_size]).digest()
+        part_count += 1
+
+    return f"{hashlib.md5(part_digests).hexdigest()}-{part_count}"
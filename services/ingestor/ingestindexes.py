@@ -0,0 +1,34 @@
+from pathlib import Path
+import time
+
+# Secondary indexes from 003_indexes.sql. The ones only readers use are dropped for a large import and built
+#       once at the end, which is cheaper than updating them for every row. The ones the ingestor reads
+#       through itself (clear_book, resuming, etag lookups) are always kept.
+INDEXES_SQL = Path(__file__).resolve().parent.parent / "database" / "server" / "migrations" / "003_indexes.sql"
+
+deferred_indexes = (
+    "bible.idx_verseoccurences_verse",
+    "bible.idx_versestoparagraphs_verse_paragraph",
+    "bible.idx_strongsoccurence_code_translation_verse",
+    "bible.idx_tokens_verse_paragraph",
+)
+
+# Tables whose indexes were rebuilt, analyzed afterwards so the planner sees the new rows
+deferred_tables = ("bible.verseoccurences", "bible.versestoparagraphs", "bible.strongsoccurence", "bible.tokens")
+
+def drop_deferred_indexes(cur):
+    for index in deferred_indexes:
+        cur.execute(f"DROP INDEX IF EXISTS {index};")
+    print(f"[{len(deferred_indexes)}] Indexes dropped until the import finishes")
+
+def create_indexes(cur):
+    # Creates any index from 003_indexes.sql that doesn't exist, e.g. after drop_deferred_indexes,
+    #       or if an earlier import died before rebuilding them
+    start_time = time.time()
+    with open(INDEXES_SQL, "r", encoding="utf-8") as file:
+        cur.execute(file.read())
+
+    for table in deferred_tables:
+        cur.execute(f"ANALYZE {table};")
+
+    print(f"✅ Indexes rebuilt in {round(time.time() - start_time, 2)} seconds!")
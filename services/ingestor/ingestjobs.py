@@ -0,0 +1,47 @@
+# bible.ingestjobs decouples downloading from ingesting. Downloaders add a job once a translation is on disk,
+#       ingest workers (any number, on any node) claim jobs one at a time with FOR UPDATE SKIP LOCKED,
+#       so two workers never get the same job and none of them wait on each other's locks.
+#       States: downloaded -> ingesting -> uploaded -> parsed, or failed from any of them (claimed again while
+#       it has attempts left). A worker updates its job after every book it imports, so only a job nobody has
+#       touched for stale_minutes is taken as abandoned and claimed again.
+
+def enqueue_job(cur, translation_id, dbl_id, agreement_id, medium, location, source_url):
+    # A translation is only queued once, downloading it again just points the job at the new location
+    cur.execute("""
+        INSERT INTO bible.ingestjobs (translation_id, dbl_id, agreement_id, medium, location, source_url)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (dbl_id, agreement_id) DO UPDATE SET location = EXCLUDED.location, updated_at = now()
+        RETURNING id;
+    """, (translation_id, dbl_id, str(agreement_id), medium, str(location), source_url))
+    return cur.fetchone()[0]
+
+def claim_job(cur, worker, max_attempts=3, stale_minutes=60):
+    # Takes the oldest job that is waiting, failed with attempts left, or was claimed by a worker that stopped
+    #       updating it (crashed). Returns (id, translation_id, dbl_id, agreement_id, medium, location, source_url) or None.
+    cur.execute("""
+        UPDATE bible.ingestjobs
+        SET state = 'ingesting', worker = %s, attempts = attempts + 1, last_error = NULL, updated_at = now()
+        WHERE id = (
+            SELECT id FROM bible.ingestjobs
+            WHERE state = 'downloaded'
+                OR (state = 'failed' AND attempts < %s)
+                OR (state IN ('ingesting', 'uploaded') AND updated_at < now() - make_interval(mins => %s))
+            ORDER BY id
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, translation_id, dbl_id, agreement_id, medium, location, source_url;
+    """, (worker, max_attempts, stale_minutes))
+    return cur.fetchone()
+
+def set_job_state(cur, job_id, state, error=None):
+    cur.execute("""
+        UPDATE bible.ingestjobs SET state = %s, last_error = %s, updated_at = now() WHERE id = %s;
+    """, (state, error, job_id))
+
+def job_counts(cur):
+    # state => number of jobs, for progress
+    cur.execute("""
+        SELECT state, count(*) FROM bible.ingestjobs GROUP BY state ORDER BY state;
+    """)
+    return dict(cur.fetchall())
@@ -5,10 +5,15 @@ import psycopg2
 from playwright.sync_api import sync_playwright
 import os
 import time
+import asyncio
 from minio import Minio
 from pathlib import Path
 
 from miniousxupload import MinioUSXUpload
+from downloader import AsyncDownloader
+from dataaccess import get_translation
+from ingestjobs import enqueue_job
+from connectionpool import db_pool
 
 from dotenv import load_dotenv
 
@@ -19,12 +24,6 @@ for parent in current.parents:
         load_dotenv(parent / ".env")
         break
 
-POSTGRES_USERNAME = os.getenv("POSTGRES_USERNAME")
-POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-POSTGRES_DB = os.getenv("POSTGRES_DB")
-POSTGRES_HOST = os.getenv("POSTGRES_HOST")
-POSTGRES_PORT = os.getenv("POSTGRES_PORT")
-
 MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT")
 MINIO_USERNAME = os.getenv("MINIO_USERNAME")
 MINIO_PASSWORD = os.getenv("MINIO_PASSWORD")
@@ -32,6 +31,21 @@ MINIO_PASSWORD = os.getenv("MINIO_PASSWORD")
 DBL_USERNAME = os.getenv("DBL_USERNAME")
 DBL_PASSWORD = os.getenv("DBL_PASSWORD")
 
+# Number of processes used to parse the books of a text translation in parallel
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+# Number of threads uploading files to minio at the same time
+INGEST_UPLOAD_WORKERS = int(os.getenv("INGEST_UPLOAD_WORKERS", "8"))
+# Read text bundles straight from the downloaded ZIP instead of extracting them first
+INGEST_STREAM_ZIP = os.getenv("INGEST_STREAM_ZIP", "false").lower() == "true"
+# Number of browser pages downloading translations at the same time, 1 keeps the single page download loop
+INGEST_DOWNLOAD_PAGES = int(os.getenv("INGEST_DOWNLOAD_PAGES", "1"))
+# Number of finished downloads allowed to wait for ingesting before pages stop downloading more
+INGEST_DOWNLOAD_QUEUE = int(os.getenv("INGEST_DOWNLOAD_QUEUE", "2"))
+# Books written in each transaction, more books means fewer commits but more to redo when one fails
+INGEST_BOOKS_PER_COMMIT = int(os.getenv("INGEST_BOOKS_PER_COMMIT", "1"))
+# Only download, and leave ingesting to ingest workers (ingestworker.py) through bible.ingestjobs
+INGEST_USE_JOBS = os.getenv("INGEST_USE_JOBS", "false").lower() == "true"
+
 class Ingestor:
     def __init__(self):
         # Worth adding option, that if dbl_id and agreement_id have been passed in, run just the class for that translation
@@ -41,6 +55,9 @@ class Ingestor:
         self.download_path = "C:/Users/CephJ/Documents/git/bible-insight-server/downloads"
         os.makedirs(self.download_path, exist_ok=True)
 
+        self.dbl_username = DBL_USERNAME
+        self.dbl_password = DBL_PASSWORD
+
         # Passes Minio client connection on to the MinioUSXUpload class
         self.client = Minio(
             MINIO_ENDPOINT,
@@ -49,21 +66,18 @@ class Ingestor:
             secure=False
         )
 
-        self.conn = psycopg2.connect(
-            host=POSTGRES_HOST,
-            port=POSTGRES_PORT,
-            dbname=POSTGRES_DB,
-            user=POSTGRES_USERNAME,
-            password=POSTGRES_PASSWORD
-        )
+        self.conn = db_pool.getconn()
 
         self.cur = self.conn.cursor()
 
-        self.get_downloads()
+        if INGEST_DOWNLOAD_PAGES > 1:
+            self.get_downloads_async()
+        else:
+            self.get_downloads()
 
         self.conn.commit()
         self.cur.close()
-        self.conn.close()
+        db_pool.putconn(self.conn)
 
     def expand_all_folders(self, page):
         """
@@ -96,29 +110,41 @@ class Ingestor:
         print("✅ All folders expanded.")
 
     def get_translation(self, dbl_id, agreement_id):
-        agreement_id = str(agreement_id)
-        self.cur.execute("""
-            SELECT id FROM bible.translations WHERE dbl_id = %s AND agreement_id = %s;
-        """, (dbl_id, agreement_id))
+        translation_id = get_translation(self.cur, dbl_id, agreement_id)
+        self.conn.commit()
 
-        # If the translation already exists, then quit processing this translation
-        translation_id = self.cur.fetchone()
-        if translation_id != None:
-            return -1
-        
-        # If not create a new entry and pass along the new id        
-        self.cur.execute("""
-            INSERT INTO bible.translationinfo (dbl_id) VALUES(%s)
-            ON CONFLICT (dbl_id) DO NOTHING;
-        """, (dbl_id,))
+        return translation_id
+
+    def ingest(self, medium, new_path, url, translation_id, dbl_id, agreement_id):
+        if INGEST_USE_JOBS:
+            job_id = enqueue_job(self.cur, translation_id, dbl_id, agreement_id, medium, new_path, url)
+            self.conn.commit()
+            print(f"✅ Queued job [{job_id}] for {dbl_id}-{agreement_id}")
+            return
+
+        match medium:
+            case "text":
+                MinioUSXUpload(self.client, "text", new_path, "bible-dbl-raw", url, translation_id, dbl_id, agreement_id, workers=INGEST_WORKERS, upload_workers=INGEST_UPLOAD_WORKERS, stream_zip=INGEST_STREAM_ZIP, books_per_commit=INGEST_BOOKS_PER_COMMIT)
+            case "audio":
+                MinioUSXUpload(self.client, "audio", new_path, "bible-dbl-raw", url, translation_id, dbl_id, agreement_id, upload_workers=INGEST_UPLOAD_WORKERS)
 
+    def get_downloads_async(self):
+        # Claims every translation up front, then downloads them with several pages while ingesting the ones already downloaded
         self.cur.execute("""
-            INSERT INTO bible.translations (dbl_id, agreement_id) VALUES(%s, %s);
-        """, (dbl_id, agreement_id))
-        self.conn.commit()
+            SELECT dbl_id, agreement_id FROM bible.DBLInfo;
+        """)
+
+        translations = []
+        for dbl_id, agreement_id in self.cur.fetchall():
+            translation_id = self.get_translation(dbl_id, agreement_id)
+            if translation_id == -1:
+                print(f"❌ Translation {dbl_id}-{agreement_id} already exists! Skipping ...")
+                continue # Skip because its already in our system
+
+            translations.append((translation_id, dbl_id, agreement_id))
 
-        self.cur.execute("""SELECT currval(pg_get_serial_sequence(%s, 'id'));""", ("bible.translations",))
-        return self.cur.fetchone()[0] # Return file_id to link to
+        print(f"✅ Starting [{len(translations)}] Translations with [{INGEST_DOWNLOAD_PAGES}] pages!")
+        asyncio.run(AsyncDownloader(self, translations, INGEST_DOWNLOAD_PAGES, INGEST_DOWNLOAD_QUEUE).run())
 
     def get_downloads(self):
         with sync_playwright() as p:
@@ -192,7 +218,7 @@ class Ingestor:
                         download.save_as(os.path.join(self.download_path, download.suggested_filename))
                         print(f"✅ Downloaded ZIP: {new_path}")
 
-                        MinioUSXUpload(self.client, "text", new_path, "bible-dbl-raw", url, translation_id, dbl_id, agreement_id)
+                        self.ingest("text", new_path, url, translation_id, dbl_id, agreement_id)
                     else:
                         print("⚠️ No ZIP button found, assuming audio download instead")
                         # Expand all folders
@@ -227,7 +253,7 @@ class Ingestor:
                         
                         print(f"✅ Downloaded {len(file_buttons)} Audio Files: {new_path}")
 
-                        MinioUSXUpload(self.client, "audio", new_path, "bible-dbl-raw", url, translation_id, dbl_id, agreement_id)
+                        self.ingest("audio", new_path, url, translation_id, dbl_id, agreement_id)
 
                     hi = False
                 
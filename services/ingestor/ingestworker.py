@@ -0,0 +1,140 @@
+from pathlib import Path
+from minio import Minio
+import argparse
+import shutil
+import socket
+import time
+import os
+
+from miniousxupload import MinioUSXUpload
+from ingestjobs import claim_job, set_job_state, job_counts
+from connectionpool import db_pool
+from tokenstage import TokenStage
+
+from dotenv import load_dotenv
+
+# Automatically find the project root (folder containing .env)
+current = Path(__file__).resolve()
+for parent in current.parents:
+    if (parent / ".env").exists():
+        load_dotenv(parent / ".env")
+        break
+
+MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT")
+MINIO_USERNAME = os.getenv("MINIO_USERNAME")
+MINIO_PASSWORD = os.getenv("MINIO_PASSWORD")
+
+# Drains bible.ingestjobs, run as many of these as wanted (on any node that can reach the downloads).
+#       With --tokenize, text translations are tokenised (tokenstage.py) once they are parsed.
+#       Usage: python ingestworker.py [--once] [--status] [--tokenize]
+
+class IngestWorker:
+    def __init__(self, bucket="bible-dbl-raw", max_attempts=3, poll_seconds=10, workers=1, upload_workers=8, stream_zip=False, tokenize=False):
+        self.bucket = bucket
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.workers = workers
+        self.upload_workers = upload_workers
+        self.stream_zip = stream_zip
+        self.tokenize = tokenize
+        self.name = f"{socket.gethostname()}-{os.getpid()}"
+
+        self.client = Minio(
+            MINIO_ENDPOINT,
+            access_key=MINIO_USERNAME,
+            secret_key=MINIO_PASSWORD,
+            secure=False
+        )
+
+        # Only used for the job table, MinioUSXUpload borrows its own connection from the pool for the import itself
+        self.conn = db_pool.getconn()
+
+        self.cur = self.conn.cursor()
+
+    def run(self, once=False):
+        # Keeps claiming jobs, waiting [poll_seconds] whenever there is nothing to do. once stops when the queue is empty.
+        processed = 0
+        while True:
+            job = claim_job(self.cur, self.name, self.max_attempts)
+            self.conn.commit()
+
+            if job == None:
+                if once:
+                    break
+                time.sleep(self.poll_seconds)
+                continue
+
+            self.process(job)
+            processed += 1
+
+        self.cur.close()
+        db_pool.putconn(self.conn)
+        print(f"✅ Worker {self.name} processed [{processed}] jobs")
+        print(f"    Connection pool: {db_pool.stats()}")
+
+    def process(self, job):
+        job_id, translation_id, dbl_id, agreement_id, medium, location, source_url = job
+        print(f"✅ Claimed job [{job_id}] {dbl_id}-{agreement_id}")
+
+        try:
+            # The download is kept until the job succeeds, so a failed job can be retried from it
+            MinioUSXUpload(
+                self.client, medium, Path(location), self.bucket, source_url, translation_id, dbl_id, agreement_id,
+                workers=self.workers, upload_workers=self.upload_workers, stream_zip=self.stream_zip, keep_source=True,
+                progress=lambda state: self.update(job_id, state)
+            )
+        except Exception as e:
+            self.conn.rollback()
+            self.update(job_id, "failed", f"{type(e).__name__}: {e}")
+            print(f"❌ Job [{job_id}] {dbl_id}-{agreement_id} failed: {e}")
+            return
+
+        self.update(job_id, "parsed")
+        remove_download(Path(location))
+
+        if self.tokenize and medium == "text":
+            try:
+                TokenStage(self.client, translation_id).run()
+            except Exception as e:
+                # The import itself is done, tokenstage.py can be rerun for just this translation
+                print(f"❌ Tokenising {dbl_id}-{agreement_id} failed, rerun tokenstage.py {translation_id}: {e}")
+
+    def update(self, job_id, state, error=None):
+        set_job_state(self.cur, job_id, state, error)
+        self.conn.commit()
+
+def remove_download(location):
+    if location.is_dir():
+        shutil.rmtree(location, ignore_errors=True)  # delete folder + contents
+    elif location.is_file():
+        location.unlink(missing_ok=True)
+
+def print_status():
+    # Borrows a connection just for the counts, no worker (or minio client) is needed
+    with db_pool.connection() as conn:
+        cur = conn.cursor()
+        counts = job_counts(cur)
+        conn.commit()
+        cur.close()
+
+    print(f"[{sum(counts.values())}] Ingest jobs")
+    for state, count in counts.items():
+        print(f"    [{count}] {state}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Claim and ingest downloaded translations from bible.ingestjobs")
+    parser.add_argument("--bucket", default="bible-dbl-raw")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Attempts before a failed job is left alone")
+    parser.add_argument("--poll", type=int, default=10, help="Seconds to wait when there are no jobs")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("INGEST_WORKERS", "1")), help="Processes parsing books")
+    parser.add_argument("--upload-workers", type=int, default=int(os.getenv("INGEST_UPLOAD_WORKERS", "8")), help="Threads uploading files")
+    parser.add_argument("--stream-zip", action="store_true", help="Read ZIPs directly instead of extracting them")
+    parser.add_argument("--tokenize", action="store_true", help="Tokenise each text translation once it is parsed")
+    parser.add_argument("--once", action="store_true", help="Stop once there are no jobs left")
+    parser.add_argument("--status", action="store_true", help="Print how many jobs are in each state and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        print_status()
+    else:
+        IngestWorker(args.bucket, args.max_attempts, args.poll, args.workers, args.upload_workers, args.stream_zip, args.tokenize).run(args.once)
@@ -0,0 +1,57 @@
+# (language_id, lemma) => bible.llemas id, every lemma of a language is loaded once so tokens don't each need a lookup.
+#       Unseen lemmas are collected per chapter and added with one INSERT ... ON CONFLICT ... RETURNING.
+
+class LemmaCache:
+    def __init__(self):
+        self.ids = {}           # (language_id, lemma) => id
+        self.languages = set()  # Languages already loaded
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, cur, language_id):
+        if language_id in self.languages:
+            return self
+
+        cur.execute("""
+            SELECT id, text FROM bible.llemas WHERE language_id = %s;
+        """, (language_id,))
+        for llema_id, text in cur.fetchall():
+            self.ids[(language_id, text)] = llema_id
+
+        self.languages.add(language_id)
+        return self
+
+    def ensure(self, cur, language_id, lemmas):
+        # Makes sure every lemma has an id before any token referencing it is written
+        new_lemmas = []
+        for lemma in lemmas:
+            if (language_id, lemma) in self.ids:
+                self.hits += 1
+                continue
+
+            self.misses += 1
+            self.ids[(language_id, lemma)] = None # Filled in below, also stops the lemma being added twice
+            new_lemmas.append(lemma)
+
+        if new_lemmas:
+            # The no-op DO UPDATE returns the id of lemmas another process added in the meantime as well
+            cur.execute("""
+                INSERT INTO bible.llemas (text, language_id)
+                SELECT unnest(%s::text[]), %s
+                ON CONFLICT (text, language_id) DO UPDATE SET text = EXCLUDED.text
+                RETURNING id, text;
+            """, (new_lemmas, language_id))
+            for llema_id, text in cur.fetchall():
+                self.ids[(language_id, text)] = llema_id
+
+        return len(new_lemmas)
+
+    def get(self, language_id, lemma):
+        return self.ids.get((language_id, lemma))
+
+    def invalidate(self):
+        self.ids = {}
+        self.languages = set()
+
+# Process wide cache, shared by every translation tokenised in this process
+lemma_cache = LemmaCache()
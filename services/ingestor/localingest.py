@@ -0,0 +1,186 @@
+from zipfile import ZipFile
+from pathlib import Path
+from minio import Minio
+from bs4 import BeautifulSoup
+import psycopg2
+import argparse
+import os
+import re
+import time
+
+from miniousxupload import MinioUSXUpload
+from bundlesource import FolderSource, ZipSource
+from dataaccess import get_translation, find_translation
+from connectionpool import db_pool
+from ingestindexes import drop_deferred_indexes, create_indexes
+from tokenstage import TokenStage
+
+from dotenv import load_dotenv
+
+# Automatically find the project root (folder containing .env)
+current = Path(__file__).resolve()
+for parent in current.parents:
+    if (parent / ".env").exists():
+        load_dotenv(parent / ".env")
+        break
+
+MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT")
+MINIO_USERNAME = os.getenv("MINIO_USERNAME")
+MINIO_PASSWORD = os.getenv("MINIO_PASSWORD")
+
+# Ingests DBL bundles that were already downloaded, without Playwright or any network access to DBL.
+#       Every ZIP (text) or folder with a metadata.xml (extracted text or audio) in the archive is imported,
+#       taking dbl_id and medium from metadata.xml, and agreement_id from the bundle name.
+#       With --update, translations that were already imported are updated to the bundle's revision, only
+#       re-importing the books whose checksum changed. With --defer-indexes, indexes only readers use are dropped
+#       for the import and rebuilt at the end, for large initial loads while nothing is reading. With --tokenize,
+#       each text translation is tokenised (tokenstage.py) straight after it is imported.
+#       Usage: python localingest.py <archive> [--agreement-id 246069] [--workers 4] [--update] [--defer-indexes] [--tokenize]
+
+# DBL names downloads {medium}-{dbl_id}-{agreement_id}, e.g. text-65eec8e0b60e656b-246069.zip
+bundle_name_re = re.compile(r"^(?:[a-z]+)-([0-9a-f]+)-(\d+)", re.IGNORECASE)
+
+def find_bundles(archive):
+    archive = Path(archive)
+    if archive.is_file() or (archive / "metadata.xml").exists():
+        return [archive]
+
+    return sorted(
+        path for path in archive.iterdir()
+        if (path.is_file() and path.suffix.lower() == ".zip") or (path / "metadata.xml").exists()
+    )
+
+def read_metadata(bundle):
+    # Only metadata.xml is read here, the rest of the bundle is left to MinioUSXUpload
+    if bundle.is_dir():
+        return BeautifulSoup(FolderSource(bundle, temporary=False).read("metadata.xml"), "xml")
+
+    with ZipFile(bundle, 'r') as zip:
+        top_levels = {Path(f).parts[0] for f in zip.namelist() if '/' in f}
+        top_folder = next(iter(top_levels)) if top_levels else None
+        return BeautifulSoup(ZipSource(zip, top_folder).read("metadata.xml"), "xml")
+
+def bundle_agreement_id(bundle, agreement_id=None):
+    # An agreement passed in on the command line wins over the one in the bundle name
+    if agreement_id != None:
+        return agreement_id
+
+    match = bundle_name_re.match(bundle.name)
+    if match:
+        return match.group(2)
+    return None
+
+class LocalIngestor:
+    def __init__(self, archive, bucket, agreement_id=None, workers=1, upload_workers=8, stream_zip=True, keep_source=True, update=False, defer_indexes=False, tokenize=False):
+        self.archive = archive
+        self.bucket = bucket
+        self.agreement_id = agreement_id
+        self.workers = workers
+        self.upload_workers = upload_workers
+        self.stream_zip = stream_zip
+        self.keep_source = keep_source
+        self.update = update
+        self.defer_indexes = defer_indexes
+        self.tokenize = tokenize
+
+        # Passes Minio client connection on to the MinioUSXUpload class
+        self.client = Minio(
+            MINIO_ENDPOINT,
+            access_key=MINIO_USERNAME,
+            secret_key=MINIO_PASSWORD,
+            secure=False
+        )
+
+        self.conn = db_pool.getconn()
+
+        self.cur = self.conn.cursor()
+
+    def run(self):
+        start_time = time.time()
+        imported = 0
+
+        bundles = find_bundles(self.archive)
+        print(f"[{len(bundles)}] Bundles found in {self.archive}")
+
+        if self.defer_indexes:
+            drop_deferred_indexes(self.cur)
+            self.conn.commit()
+
+        try:
+            for bundle in bundles:
+                if self.ingest_bundle(bundle):
+                    imported += 1
+        finally:
+            # Rebuilt even if an import failed, so readers aren't left without them
+            if self.defer_indexes:
+                self.conn.rollback()
+                create_indexes(self.cur)
+                self.conn.commit()
+
+        self.cur.close()
+        db_pool.putconn(self.conn)
+
+        duration = round(time.time() - start_time, 2)
+        print(f"✅ Imported [{imported}] of [{len(bundles)}] bundles in {duration} seconds!")
+        print(f"    Connection pool: {db_pool.stats()}")
+
+    def ingest_bundle(self, bundle):
+        metadata_xml = read_metadata(bundle)
+        dbl_metadata = metadata_xml.find("DBLMetadata")
+        dbl_id = dbl_metadata.get("id")
+        medium = dbl_metadata.get("type")
+
+        agreement_id = bundle_agreement_id(bundle, self.agreement_id)
+        if agreement_id == None:
+            print(f"⚠️ No agreement id for {bundle.name}, name it {medium}-{dbl_id}-<agreement_id> or pass --agreement-id. Skipping ...")
+            return False
+
+        if medium not in ("text", "audio"):
+            print(f"⚠️ {bundle.name} is {medium}, only text and audio can be imported. Skipping ...")
+            return False
+
+        # Audio is only read from an extracted folder (MinioUSXUpload.import_medium)
+        if medium == "audio" and not bundle.is_dir():
+            print(f"⚠️ {bundle.name} is an audio ZIP, extract it into a folder to import it. Skipping ...")
+            return False
+
+        translation_id = get_translation(self.cur, dbl_id, agreement_id)
+        self.conn.commit()
+
+        if translation_id == -1 and self.update:
+            translation_id = find_translation(self.cur, dbl_id, agreement_id)
+            print(f"✅ Updating Translation {dbl_id}-{agreement_id} to revision {dbl_metadata.get('revision')}!")
+        elif translation_id == -1:
+            print(f"❌ Translation {dbl_id}-{agreement_id} already exists! Skipping ...")
+            return False
+
+        print(f"✅ Starting Translation {dbl_id}-{agreement_id} Processing!")
+
+        MinioUSXUpload(
+            self.client, medium, bundle, self.bucket, bundle.resolve().as_uri(), translation_id, dbl_id, agreement_id,
+            workers=self.workers, upload_workers=self.upload_workers, stream_zip=self.stream_zip, keep_source=self.keep_source,
+            revision_diff=self.update
+        )
+
+        if self.tokenize and medium == "text":
+            TokenStage(self.client, translation_id).run()
+        return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest already downloaded DBL bundles (ZIPs or extracted folders)")
+    parser.add_argument("archive", help="A bundle, or a directory of bundles")
+    parser.add_argument("--agreement-id", default=None, help="Agreement id, when it isn't in the bundle name")
+    parser.add_argument("--bucket", default="bible-dbl-raw")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("INGEST_WORKERS", "1")), help="Processes parsing books")
+    parser.add_argument("--upload-workers", type=int, default=int(os.getenv("INGEST_UPLOAD_WORKERS", "8")), help="Threads uploading files")
+    parser.add_argument("--extract", action="store_true", help="Extract ZIPs to disk instead of reading them directly")
+    parser.add_argument("--delete", action="store_true", help="Delete each bundle once it is imported")
+    parser.add_argument("--update", action="store_true", help="Update imported translations, only re-importing changed books")
+    parser.add_argument("--defer-indexes", action="store_true", help="Drop indexes only readers use during the import, rebuild them at the end")
+    parser.add_argument("--tokenize", action="store_true", help="Tokenise each text translation after it is imported")
+    args = parser.parse_args()
+
+    LocalIngestor(
+        args.archive, args.bucket, args.agreement_id, args.workers, args.upload_workers,
+        stream_zip=not args.extract, keep_source=not args.delete, update=args.update, defer_indexes=args.defer_indexes, tokenize=args.tokenize
+    ).run()
@@ -1,14 +1,28 @@
 from zipfile import ZipFile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from minio import Minio
+from minio.commonconfig import CopySource
 from pathlib import Path
 import os
 from bs4 import BeautifulSoup
 import psycopg2
 import shutil
+from collections import deque
+import io
 import re
 import time
 
 from book import Book
+from usxparser import parse_book
+from writebuffer import WriteBuffer
+from pgbackend import insert_rows
+from dataaccess import insert_returning_id, get_or_create_id
+from etag import local_etag, PART_SIZE
+from bundlesource import FolderSource, ZipSource
+from bookcheckpoints import load_checkpoints, complete_book, clear_book
+from styleregistry import style_registry
+from strongscache import strongs_cache
+from connectionpool import db_pool
 
 from dotenv import load_dotenv
 
@@ -19,14 +33,8 @@ for parent in current.parents:
         load_dotenv(parent / ".env")
         break
 
-POSTGRES_USERNAME = os.getenv("POSTGRES_USERNAME")
-POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-POSTGRES_DB = os.getenv("POSTGRES_DB")
-POSTGRES_HOST = os.getenv("POSTGRES_HOST")
-POSTGRES_PORT = os.getenv("POSTGRES_PORT")
-
 class MinioUSXUpload:
-    def __init__(self, minio_client: Minio, medium, process_location, bucket, source_url, translation_id, dbl_id, agreement_id):
+    def __init__(self, minio_client: Minio, medium, process_location, bucket, source_url, translation_id, dbl_id, agreement_id, flush_size=1000, workers=1, upload_workers=8, stream_zip=False, keep_source=False, progress=None, revision_diff=False, books_per_commit=1):
         self.client = minio_client
         self.medium = medium # Audio | Video | Text (USX)
         self.process_location = process_location
@@ -34,64 +42,88 @@ class MinioUSXUpload:
         self.translation_id = translation_id
         self.dbl_id = dbl_id
         self.agreement_id = agreement_id
-
-        # Adds a database connection
-        self.conn = psycopg2.connect(
-            host=POSTGRES_HOST,
-            port=POSTGRES_PORT,
-            dbname=POSTGRES_DB,
-            user=POSTGRES_USERNAME,
-            password=POSTGRES_PASSWORD
-        )
+        self.workers = workers # Processes used to parse books, 1 parses them in this process one at a time
+        self.upload_workers = upload_workers # Threads reading and uploading files to minio at the same time
+        self.stream_zip = stream_zip # Read text bundles straight from the ZIP instead of extracting them
+        self.keep_source = keep_source # Leave the ZIP/folder in place after importing (e.g. a local archive)
+        self.progress = progress # Called with the import's state (e.g. "uploaded") as it moves along, for job queues
+        self.revision_diff = revision_diff # Updating an imported translation, only books whose checksum changed are read (localingest --update)
+        self.books_per_commit = books_per_commit # Books written in each transaction
+        self.uncommitted_books = 0
+        self.incomplete_books = 0 # Books with chapters that failed, the translation stays resumable while there are any
+
+        # Borrows a database connection from the process wide pool for the whole import
+        self.conn = db_pool.getconn()
 
         self.revision = None
+        self.book_codes = None
+        self.existing_files = {} # object_name => (file_id, etag) already stored for this revision
+        self.uploaded_files = 0
+        self.skipped_files = 0
+        self.checkpoints = {} # book_code => etag of every book already imported into this translation
+        self.skipped_books = 0
 
         self.cur = self.conn.cursor()
 
+        # Rows are collected per table and written in bulk every [flush_size] rows
+        self.write_buffer = WriteBuffer(self.conn, flush_size)
+
+        # Cache is shared by the whole process, so keep where the counters started for this import's summary
+        self.strongs_hits, self.strongs_misses = strongs_cache.hits, strongs_cache.misses
+
         self.start_time = time.time()
 
-        self.source_id = self.get_source(source_url)
+        self.metadata_content = ""
 
-        print("✅ Starting Upload ...")
+        try:
+            self.source_id = self.get_source(source_url)
 
-        # Fetch and print result
-        # version = self.cur.fetchone()
-        # print("Connected successfully! PostgreSQL version:", version)
+            print("✅ Starting Upload ...")
 
-        self.metadata_content = ""
+            self.import_medium(medium)
 
+            self.write_buffer.flush()
+            self.conn.commit()
+        finally:
+            # Always hand the connection back, the pool rolls back anything a failed import left uncommitted
+            self.cur.close()
+            db_pool.putconn(self.conn)
+
+        duration = round(time.time() - self.start_time, 2)
+        print(f"✅ Completed Translation Import in {duration} seconds!")
+        print(f"    [{self.uploaded_files}] files uploaded, [{self.skipped_files}] unchanged files skipped")
+        if self.skipped_books > 0:
+            print(f"    [{self.skipped_books}] books already imported skipped")
+        for table, written in self.write_buffer.written.items():
+            if written > 0:
+                print(f"    [{written}] rows written to {table}")
+        if self.medium == "text":
+            hits = strongs_cache.hits - self.strongs_hits
+            misses = strongs_cache.misses - self.strongs_misses
+            print(f"    Strongs cache: [{hits}] hits, [{misses}] misses")
+        print()
+
+    def import_medium(self, medium):
         # self.stream_file("bible-raw", "text-65eec8e0b60e656b-246069/release/USX_1/1CH.usx")
         match medium:
             case "text": # USX Files e.g. for deeper analysis
                 # unzip first
-                self.unzip_folder(self.process_location)
+                if Path(self.process_location).is_dir():
+                    # Already extracted bundle
+                    self.check_files(FolderSource(self.process_location, temporary=not self.keep_source))
+                elif self.stream_zip:
+                    self.read_zip(self.process_location)
+                else:
+                    self.unzip_folder(self.process_location)
             case "video": # Videos e.g. for the deaf (sign language)
                 # self.check_files(self.process_location)
                 pass
             case "audio": # Audio e.g. for the blind or preference
-                self.check_files(self.process_location)
-
-        self.conn.commit()
-        self.cur.close()
-        self.conn.close()
-
-        duration = round(time.time() - self.start_time, 2)
-        print(f"✅ Completed Translation Import in {duration} seconds!\n")
+                self.check_files(FolderSource(self.process_location, temporary=not self.keep_source))
 
     def get_source(self, source_url):
-        # Find if url is already stored source in database
-        self.cur.execute("""SELECT id FROM bible.sources WHERE url = %s;""", (source_url,))
-        source_id = self.cur.fetchone()
-        if source_id != None:
-            return source_id[0]
-        
-        # If not create new and return it
-        self.cur.execute("""
-            INSERT INTO bible.sources (url) 
-            VALUES (%s);
-        """, (source_url,))
-        self.cur.execute("""SELECT currval(pg_get_serial_sequence(%s, 'id'));""", ("bible.sources",))
-        return self.cur.fetchone()[0]
+        # Find if url is already stored source in database, if not create new and return it
+        return get_or_create_id(self.cur, "bible.sources", {"url": source_url}, ("url",))
 
     def unzip_folder(self, zip_path):
         # This will unzip the zip folder, and then delete the original and replace process location with new path name
@@ -110,44 +142,52 @@ class MinioUSXUpload:
 
             # Saves the new location for the usx files to be ran in next part of pipeline
             new_location = downloads_location / top_folder
-            self.check_files(new_location)
+            self.check_files(FolderSource(new_location))
 
         # After unzipping delete the old zip file
+        if self.keep_source:
+            return
+
         shutil.rmtree(zip_path, ignore_errors=True)
         if zip_path.is_dir():
             shutil.rmtree(zip_path, ignore_errors=True)  # delete folder + contents
         elif zip_path.is_file():
             Path(zip_path).unlink(missing_ok=True)
 
-    def get_support_files(self, file_location, object_start, file_path, content_type):
+    def read_zip(self, zip_path):
+        # Same as unzip_folder, but metadata.xml and the files it references are read straight from the ZIP,
+        #       so nothing is written to (or read back from) disk and no temporary space is needed
+        with ZipFile(zip_path, 'r') as zip:
+            all_files = zip.namelist()
+
+            # find the top-level folder (first part before '/')
+            top_levels = {Path(f).parts[0] for f in all_files if '/' in f}
+            top_folder = next(iter(top_levels)) if top_levels else None
+
+            self.check_files(ZipSource(zip, top_folder))
+
+        if not self.keep_source:
+            Path(zip_path).unlink(missing_ok=True)
+
+    def get_support_files(self, source, object_start, file_path, content_type, file_data=None):
         file_name = file_path.split("/")[-1]
         object_name = object_start + f"{file_name}"
 
-        new_file_path = Path(file_location) / file_path
-        if new_file_path.exists():
-            return self.upload_file(object_name, new_file_path, content_type)
+        if file_data != None:
+            return self.upload_file(object_name, file_data, content_type)
+        if source.exists(file_path):
+            return self.upload_file(object_name, source.read(file_path), content_type)
         
         return None
     
     def check_language(self, language_xml):
         # Check if language already added to database, if not create it and return language_id
-        self.cur.execute("""SELECT id FROM bible.languages WHERE iso = %s;""", (language_xml.find("iso").text,))
-        language_id = self.cur.fetchone()
-
-        if language_id != None:
-            return language_id[0]
-        
-        self.cur.execute("""
-            INSERT INTO bible.languages (iso, name, namelocal, scriptdirection) 
-            VALUES (%s, %s, %s, %s);
-        """, (
-            language_xml.find("iso").text,
-            language_xml.find("name").text,
-            language_xml.find("nameLocal").text,
-            language_xml.find("scriptDirection").text
-        ))
-        self.cur.execute("""SELECT currval(pg_get_serial_sequence(%s, 'id'));""", ("bible.languages",))
-        return self.cur.fetchone()[0]
+        return get_or_create_id(self.cur, "bible.languages", {
+            "iso": language_xml.find("iso").text,
+            "name": language_xml.find("name").text,
+            "namelocal": language_xml.find("nameLocal").text,
+            "scriptdirection": language_xml.find("scriptDirection").text
+        }, ("iso",))
     
     def update_translationinfo_db(self, metadata_xml):
         self.language_id = self.check_language(metadata_xml.find("language"))
@@ -173,6 +213,11 @@ class MinioUSXUpload:
         self.create_translation_relationships(metadata_xml)
 
     def create_translation_relationships(self, metadata_xml):
+        # Replaces the relationships stored by an earlier run (resumed or --update) of this revision, so they aren't duplicated
+        self.cur.execute("""
+            DELETE FROM bible.translationrelationships WHERE from_translation = %s AND from_revision = %s;
+        """, (self.dbl_id, self.revision))
+
         translation_relationships = metadata_xml.find("relationships")
         for relation in translation_relationships.find_all("relation"):
             # Example: <relation id="9879dbb7cfe39e4d" revision="4" type="text" relationType="source"/>
@@ -182,32 +227,32 @@ class MinioUSXUpload:
             self.cur.execute("""
                 INSERT INTO bible.translationrelationships (from_translation, from_revision, to_translation, to_revision, type) 
                 VALUES (%s, %s, %s, %s, %s)
-            """, (self.translation_id, self.revision, relation_dbl_id, relation_revision, relation_type))
+            """, (self.dbl_id, self.revision, relation_dbl_id, relation_revision, relation_type))
 
-    def check_files(self, file_location):
-        top_folder = str(file_location).split("\\")[-1]
+    def check_files(self, source):
+        self.source = source
+        top_folder = source.name
 
         # Find metadata file
-        metadata_file_path = Path(file_location) / "metadata.xml"
-        metadata_file_content = ""
-        with open(metadata_file_path, encoding="utf-8") as file:
-            metadata_file_content = file.read()
+        metadata_file_content = source.read("metadata.xml")
 
         metadata_xml = BeautifulSoup(metadata_file_content, "xml")
+        # Relationships are stored for this revision, so it has to be known first
+        self.revision = metadata_xml.find("DBLMetadata").get("revision")
         self.update_translationinfo_db(metadata_xml)
 
-        self.revision = metadata_xml.find("DBLMetadata").get("revision")
         revision_note = metadata_xml.find("archiveStatus").find("comments")
         if revision_note != None:
             revision_note = revision_note.text
 
         object_start = f"{top_folder}/{self.revision}/"
+        self.load_existing_files(object_start)
 
         # Since dependant on language
         ldml_file = metadata_xml.select_one('resource[uri$=".ldml"]').get("uri")
         ldml_file_id = None
         if ldml_file is not None:
-            ldml_file_id = self.get_support_files(file_location, object_start, ldml_file, "application/xml")
+            ldml_file_id = self.get_support_files(source, object_start, ldml_file, "application/xml")
 
         # Update this information for translation in database
         self.cur.execute("""
@@ -223,127 +268,324 @@ class MinioUSXUpload:
         """, (
             self.revision, 
             revision_note, 
-            self.get_support_files(file_location, object_start, "metadata.xml", "application/xml"),
-            self.get_support_files(file_location, object_start, "license.xml", "application/xml"),
+            self.get_support_files(source, object_start, "metadata.xml", "application/xml", metadata_file_content),
+            self.get_support_files(source, object_start, "license.xml", "application/xml"),
             ldml_file_id,
-            self.get_support_files(file_location, object_start, "release/versification.vrs", "application/xml"),
-            self.get_support_files(file_location, object_start, "release/styles.xml", "application/xml"),
+            self.get_support_files(source, object_start, "release/versification.vrs", "application/xml"),
+            self.get_support_files(source, object_start, "release/styles.xml", "application/xml"),
             self.translation_id
         ))
 
         self.conn.commit() # Commit all changes to database
 
+        # Styles are only read from the database once, then shared by every paragraph and verse
+        self.styles = style_registry.load(self.cur)
+        self.strongs = strongs_cache.load(self.cur)
+        self.checkpoints = load_checkpoints(self.cur, self.translation_id)
+
         publication = metadata_xml.find("publication", default="true") # Get default files for publication
         contents = publication.find_all("content")
 
+        text_books = [] # (book_map_id, book_code, file_id, file_path, book_data, etag) for every book to parse, in publication order
+        book_files = [] # (content, object_name, file_path, content_type) for every file to upload, in publication order
+        published_books = set() # Every text book in this revision
+
         # Selectively upload the files I want in the format I want (from metadata)
         for content in contents:
-            # Get the file path for current file
-            parts = content.get("src").split("/")
-            file_name = parts[-1] # Get filename
-            file_path = file_location
-            for part in parts:
-                file_path = file_path / part
+            # Get the file path for current file (relative to the bundle)
+            file_path = content.get("src")
+            file_name = file_path.split("/")[-1] # Get filename
 
             chapter_ref = content.get("role")
             book = chapter_ref.split(" ")[0]
 
-            self.cur.execute("""
-                SELECT code FROM bible.books WHERE code = %s;
-            """, (book,))
-            found_book = self.cur.fetchone()
-
-            if found_book != None:
-                # If this is text and the book is among ones we are interested in, take the file and upload it to minio
+            if book in self.load_book_codes():
+                # If this is text and the book is among ones we are interested in, queue the file to be uploaded to minio
                 object_name = f"{top_folder}/{self.revision}/{file_name}"
-                content_type = metadata_xml.find("resource", uri=content.get("src")).get("mimeType")
-                file_id = self.upload_file(object_name, file_path, content_type)
-
-                book_info = metadata_xml.find("name", id=content.get("name"))
-                short_name = book_info.find("short").text
-                long_name = book_info.find("long").text
-                
-                # Then update the database linking to them
+                resource = metadata_xml.find("resource", uri=content.get("src"))
+                content_type = resource.get("mimeType")
+
                 if self.medium == "text":
-                    self.cur.execute("""
-                        INSERT INTO bible.booktofile (book_code, translation_id, file_id, short, long) VALUES (%s, %s, %s, %s, %s);
-                    """, (book, self.translation_id, file_id, short_name, long_name))
-                    self.cur.execute("""SELECT currval(pg_get_serial_sequence(%s, 'id'));""", ("bible.booktofile",))
-                    book_map_id = self.cur.fetchone()[0]
-
-                    Book(self.language_id, self.translation_id, book_map_id, file_id, self.stream_file(object_name), self.conn)
-                if self.medium == "audio":
-                    # Audio and eventually video don't have any connection but in serving the files themselves for consumption
-                    #   Maybe in the future some ML analysis but not needed right now or necesitates, using the class to build
-                    #   Since below are all the database references it needs.
-                    self.cur.execute("""
-                        INSERT INTO bible.booktofile (book_code, translation_id, file_id, short, long) VALUES (%s, %s, %s, %s, %s);
-                    """, (book, self.translation_id, None, short_name, long_name))
-                    self.cur.execute("""SELECT currval(pg_get_serial_sequence(%s, 'id'));""", ("bible.booktofile",))
-                    book_map_id = self.cur.fetchone()[0]
+                    published_books.add(book)
+                    if self.unchanged_book(book, resource):
+                        # Still linked to a file of this revision, without being read, uploaded or parsed again
+                        short_name, long_name = self.book_names(metadata_xml, content)
+                        self.get_book_map(book, self.copy_unchanged_file(book, object_name, content_type), short_name, long_name)
+                        continue
 
-                    self.cur.execute("""
-                        INSERT INTO bible.chapteroccurences (chapter_ref, file_id, book_to_file_id) VALUES (%s, %s, %s);
-                    """, (chapter_ref, file_id, book_map_id))
-        
+                book_files.append((content, object_name, file_path, content_type))
+
+        if self.revision_diff:
+            self.remove_unpublished_books(published_books)
+
+        uploaded = self.upload_files([(object_name, file_path, content_type) for content, object_name, file_path, content_type in book_files])
+
+        for (content, object_name, file_path, content_type), (file_id, file_data) in zip(book_files, uploaded):
+            chapter_ref = content.get("role")
+            book = chapter_ref.split(" ")[0]
+
+            short_name, long_name = self.book_names(metadata_xml, content)
+            
+            # Then update the database linking to them
+            if self.medium == "text":
+                book_map_id = self.get_book_map(book, file_id, short_name, long_name)
+
+                # Books finished by an earlier run of this import, from the same file, don't need parsing again
+                etag = self.existing_files[object_name][1]
+                if self.checkpoints.get(book) == etag:
+                    self.skipped_books += 1
+                    continue
+
+                text_books.append((book_map_id, book, file_id, file_path, file_data, etag))
+            if self.medium == "audio":
+                # Audio and eventually video don't have any connection but in serving the files themselves for consumption
+                #   Maybe in the future some ML analysis but not needed right now or necesitates, using the class to build
+                #   Since below are all the database references it needs.
+                book_map_id = insert_returning_id(self.cur, "bible.booktofile", {
+                    "book_code": book,
+                    "translation_id": self.translation_id,
+                    "file_id": None,
+                    "short": short_name,
+                    "long": long_name
+                })
+
+                self.cur.execute("""
+                    INSERT INTO bible.chapteroccurences (chapter_ref, file_id, book_to_file_id) VALUES (%s, %s, %s);
+                """, (chapter_ref, file_id, book_map_id))
+
+        self.conn.commit()
+        if self.progress != None:
+            self.progress("uploaded")
+
+        self.create_books(text_books)
+
+        # Every book is in, a rerun of this translation is now skipped instead of resumed
+        if self.incomplete_books == 0:
+            self.cur.execute("""
+                UPDATE bible.translations SET imported_at = now() WHERE id = %s;
+            """, (self.translation_id,))
         self.conn.commit()
 
         print("Cleaning Up Artifacts...")
         
-        if file_location.is_dir():
-            shutil.rmtree(file_location, ignore_errors=True)  # delete folder + contents
-        elif file_location.is_file():
-            Path(file_location).unlink(missing_ok=True)
-
-    def upload_file(self, object_name, file_path, content_type):
-        self.client.fput_object(self.bucket, object_name, str(file_path), content_type=content_type)
-        info = self.client.stat_object(self.bucket, object_name)
-        # Example
-            # Object(
-            #     bucket_name='bible-dbl-raw', 
-            #     object_name='text-65eec8e0b60e656b-246069/10/2JN.usx', 
-            #     last_modified=datetime.datetime(2025, 10, 23, 16, 43, 21, tzinfo=datetime.timezone.utc), 
-            #     etag='9b6bcda7e20ed8ffad0953711880191e', 
-            #     size=3713, 
-            #     metadata=HTTPHeaderDict(
-            #         {'Accept-Ranges': 'bytes', 
-            #          'Content-Length': '3713', 
-            #          'Content-Type': 'application/xml', 
-            #          'ETag': '"9b6bcda7e20ed8ffad0953711880191e"', 
-            #          'Last-Modified': 'Thu, 23 Oct 2025 16:43:21 GMT', 
-            #          'Server': 'MinIO', 
-            #          'Strict-Transport-Security': 'max-age=31536000; includeSubDomains', 
-            #          'Vary': 'Origin, Accept-Encoding', 
-            #          'X-Amz-Id-2': 'dd9025bab4ad464b049177c95eb6ebf374d3b3fd1af9251148b658df7ac2e3e8', 
-            #          'X-Amz-Request-Id': '18712C730E5C7C9C', 
-            #          'X-Content-Type-Options': 'nosniff', 
-            #          'X-Ratelimit-Limit': '6778', 
-            #          'X-Ratelimit-Remaining': '6778', 
-            #          'X-Xss-Protection': '1; mode=block', 
-            #          'Date': 'Thu, 23 Oct 2025 16:43:21 GMT'}), 
-            #     version_id=None, 
-            #     is_latest=None, 
-            #     storage_class=None, 
-            #     owner_id=None, 
-            #     owner_name=None, 
-            #     content_type='application/xml', 
-            #     is_delete_marker=False, 
-            #     tags=None, 
-            #     is_dir=False
-            # )
-        
+        source.cleanup()
+
+    def read_book(self, file_path, book_data):
+        # Sources that don't keep file data (ZIPs) are read again here, so only the books being parsed are in memory
+        if book_data != None:
+            return book_data
+        return self.source.read(file_path)
+
+    def unchanged_book(self, book_code, resource):
+        # In a revision diff, a book is left as it is (not read, uploaded or parsed) when the md5 checksum metadata.xml
+        #       gives its file matches the etag of the file it was imported from. Files uploaded in several parts
+        #       have a different kind of etag, so they never match and are always imported again.
+        if not self.revision_diff:
+            return False
+
+        checksum = resource.get("checksum")
+        if checksum == None or self.checkpoints.get(book_code) != checksum:
+            return False
+
+        if self.imported_file(book_code) == None:
+            return False
+
+        self.skipped_books += 1
+        return True
+
+    def imported_file(self, book_code):
+        # (bucket, file_path, etag) of the file this translation's book was last imported from, or None
         self.cur.execute("""
-            INSERT INTO bible.files (etag, type, file_path, bucket, source_id) 
-            VALUES (%s, %s, %s, %s, %s)
-        """, (info.etag, info.content_type, info.object_name, info.bucket_name, self.source_id))
-        self.cur.execute("""SELECT currval(pg_get_serial_sequence(%s, 'id'));""", ("bible.files",))
+            SELECT f.bucket, f.file_path, f.etag FROM bible.booktofile b
+            JOIN bible.files f ON f.id = b.file_id
+            WHERE b.translation_id = %s AND b.book_code = %s
+            ORDER BY b.id LIMIT 1;
+        """, (self.translation_id, book_code))
+        return self.cur.fetchone()
+
+    def copy_unchanged_file(self, book_code, object_name, content_type):
+        # The unchanged file is copied into this revision's folder inside minio (nothing is downloaded or uploaded),
+        #       so the book points at a file of the revision it is now part of, like every other file
+        bucket, file_path, etag = self.imported_file(book_code)
+        existing = self.existing_files.get(object_name)
+        if existing == None or existing[1] != etag:
+            etag = self.client.copy_object(self.bucket, object_name, CopySource(bucket, file_path)).etag
+
+        return self.record_file(object_name, etag, content_type)
+
+    def remove_unpublished_books(self, published_books):
+        # Books the new revision no longer has are removed, the rest are either unchanged or imported again
+        for book_code in set(self.checkpoints) - published_books:
+            cleared = clear_book(self.cur, self.translation_id, book_code)
+            print(f"[{cleared}] Chapters removed for {book_code}, no longer in revision {self.revision}")
+        self.conn.commit()
+
+    def book_names(self, metadata_xml, content):
+        book_info = metadata_xml.find("name", id=content.get("name"))
+        return book_info.find("short").text, book_info.find("long").text
+
+    def get_book_map(self, book_code, file_id, short_name, long_name):
+        # Reuses the booktofile row from an earlier run of this import, so a resumed import doesn't duplicate it
+        self.cur.execute("""
+            SELECT id, file_id FROM bible.booktofile WHERE translation_id = %s AND book_code = %s ORDER BY id LIMIT 1;
+        """, (self.translation_id, book_code))
+        row = self.cur.fetchone()
+
+        if row == None:
+            return insert_returning_id(self.cur, "bible.booktofile", {
+                "book_code": book_code,
+                "translation_id": self.translation_id,
+                "file_id": file_id,
+                "short": short_name,
+                "long": long_name
+            })
+
+        # Notes are linked to the book's file, not to booktofile. They move to the new file with the book, so
+        #       clear_book and TokenStage.clearBook (which delete by the book's current file) still find them,
+        #       and an unchanged book keeps its notes.
+        if row[1] != file_id:
+            for notes_table in ("bible.translationfootnotes", "bible.translationrefnotes"):
+                self.cur.execute(f"""
+                    UPDATE {notes_table} SET file_id = %s WHERE file_id = %s;
+                """, (file_id, row[1]))
+
+        self.cur.execute("""
+            UPDATE bible.booktofile SET file_id = %s, short = %s, long = %s WHERE id = %s;
+        """, (file_id, short_name, long_name, row[0]))
+        return row[0]
+
+    def create_book(self, book_map_id, book_code, file_id, etag, book_usx):
+        # A book is committed together with its checkpoint, anything left from an earlier run (unfinished, or an older
+        #       revision of the book) is removed first
+        cleared = clear_book(self.cur, self.translation_id, book_code)
+        if cleared > 0:
+            print(f"[{cleared}] Earlier chapters removed for {book_code} before importing it again")
+
+        book = Book(self.language_id, self.translation_id, book_map_id, file_id, book_usx, self.conn, self.write_buffer, self.styles, self.strongs)
+
+        # A book with chapters that were rolled back is kept, but without a checkpoint, so a rerun imports it again
+        if book.failed_chapters:
+            print(f"⚠️ {book_code} imported without its failed chapters, it will be imported again on the next run")
+            self.incomplete_books += 1
+        else:
+            complete_book(self.cur, self.translation_id, book_code, etag)
+
+        self.uncommitted_books += 1
+        if self.uncommitted_books >= self.books_per_commit:
+            self.conn.commit()
+            self.uncommitted_books = 0
+
+        # Reported after every book as well, so a job queue can tell the import is still running (see ingestjobs.claim_job)
+        if self.progress != None:
+            self.progress("uploaded")
+
+    def create_books(self, text_books):
+        # Books are committed [books_per_commit] at a time. If one fails, every book since the last commit is rolled
+        #       back, along with the caches, since they may hold rows that were just rolled back.
+        try:
+            self.create_books_in_order(text_books)
+        except Exception:
+            self.conn.rollback()
+            self.write_buffer.discard()
+            style_registry.invalidate()
+            strongs_cache.invalidate()
+            raise
+
+        self.conn.commit()
+        self.uncommitted_books = 0
+
+    def create_books_in_order(self, text_books):
+        if self.workers <= 1:
+            for book_map_id, book_code, file_id, file_path, book_data, etag in text_books:
+                self.create_book(book_map_id, book_code, file_id, etag, self.read_book(file_path, book_data))
+            return
 
-        file_id = self.cur.fetchone()[0]
+        # Parsing is CPU bound, so books are parsed in parallel by a pool of processes, while this process stays
+        #       the only one writing to the database. Results are used in publication order, so ids are always
+        #       assigned in the same order as a sequential import. Only a few books per worker are submitted
+        #       ahead (executor.map would read every book up front).
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+
+            for book_map_id, book_code, file_id, file_path, book_data, etag in text_books:
+                pending.append((book_map_id, book_code, file_id, etag, executor.submit(parse_book, self.read_book(file_path, book_data))))
+                if len(pending) < self.workers * 2:
+                    continue
+
+                book_map_id, book_code, file_id, etag, usx_chapters = pending.popleft()
+                self.create_book(book_map_id, book_code, file_id, etag, usx_chapters.result())
+
+            while pending:
+                book_map_id, book_code, file_id, etag, usx_chapters = pending.popleft()
+                self.create_book(book_map_id, book_code, file_id, etag, usx_chapters.result())
+
+    def load_existing_files(self, object_start):
+        # Files already stored for this revision, so a re-import only uploads what changed
+        self.cur.execute("""
+            SELECT id, file_path, etag FROM bible.files WHERE bucket = %s AND file_path LIKE %s ORDER BY id;
+        """, (self.bucket, object_start + "%"))
+        self.existing_files = {file_path: (file_id, etag) for file_id, file_path, etag in self.cur.fetchall()}
+
+    def upload_files(self, files):
+        # Files are read and uploaded by a bounded pool of threads, so uploads are limited by bandwidth rather than
+        #       one request at a time. The database is only written from this thread, in the same order as files.
+        #       Returns (file_id, file_data) for each file, file_data is only kept for text so it can be parsed.
+        uploaded = []
+        with ThreadPoolExecutor(max_workers=self.upload_workers) as executor:
+            for (object_name, file_path, content_type), (etag, file_data) in zip(files, executor.map(self.read_and_put_file, files)):
+                uploaded.append((self.record_file(object_name, etag, content_type), file_data))
+                if self.progress != None:
+                    self.progress("ingesting") # Still running, uploads of large (e.g. audio) bundles can take a while
+
+        return uploaded
+
+    def read_and_put_file(self, file):
+        # Runs in an upload thread, each file is only read from the source once
+        object_name, file_path, content_type = file
+        file_data = self.source.read(file_path)
+        etag = self.put_file(object_name, file_data, content_type)
+
+        if self.medium != "text" or not self.source.keep_data:
+            file_data = None # Audio isn't parsed and ZIP books are read again when parsed, don't hold every file in memory
+        return etag, file_data
+
+    def put_file(self, object_name, file_data, content_type):
+        # Only uploads when the etag minio would give the file differs from the one already stored
+        etag = local_etag(file_data)
+        existing = self.existing_files.get(object_name)
+        if existing != None and existing[1] == etag:
+            return etag
+
+        # The put result already has the etag, no need for a separate stat_object call
+        result = self.client.put_object(self.bucket, object_name, io.BytesIO(file_data), len(file_data), content_type=content_type, part_size=PART_SIZE)
+        return result.etag
+
+    def record_file(self, object_name, etag, content_type):
+        # Reuses the stored file when it didn't change, otherwise adds the new upload to bible.files
+        existing = self.existing_files.get(object_name)
+        if existing != None and existing[1] == etag:
+            self.skipped_files += 1
+            return existing[0]
+
+        self.uploaded_files += 1
+        file_id = insert_returning_id(self.cur, "bible.files", {
+            "etag": etag,
+            "type": content_type,
+            "file_path": object_name,
+            "bucket": self.bucket,
+            "source_id": self.source_id
+        })
+        self.existing_files[object_name] = (file_id, etag)
+        return file_id
+
+    def upload_file(self, object_name, file_data, content_type):
+        # Uploads from the bytes already read from disk, so nothing needs to be downloaded again to be processed
+        file_id = self.record_file(object_name, self.put_file(object_name, file_data, content_type), content_type)
 
         if "versification" in object_name:
-            self.createVersification(self.stream_file(object_name))
+            self.createVersification(file_data.decode("utf-8"))
         elif "styles" in object_name:
-            self.createStylesAndProperties(self.stream_file(object_name), file_id)
+            self.createStylesAndProperties(file_data, file_id)
         # elif "ldml" in object_name:
 
         return file_id # Return file_id to link to
@@ -411,13 +653,14 @@ class MinioUSXUpload:
                 style_versetext = style_parent.get("versetext")
                 style_publishable = style_parent.get("publishable")
 
-                self.cur.execute("""
-                    INSERT INTO bible.styles (style, name, description, versetext, publishable, source_file_id) 
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, (style, style_name, style_description, style_versetext, style_publishable, styles_file_id))
-
-                self.cur.execute("""SELECT currval(pg_get_serial_sequence(%s, 'id'));""", ("bible.styles",))
-                style_id = self.cur.fetchone()[0]
+                style_id = insert_returning_id(self.cur, "bible.styles", {
+                    "style": style,
+                    "name": style_name,
+                    "description": style_description,
+                    "versetext": style_versetext,
+                    "publishable": style_publishable,
+                    "source_file_id": styles_file_id
+                })
 
                 previous_style_parent = style_parent
 
@@ -433,6 +676,9 @@ class MinioUSXUpload:
                 """, (property_name, property_value, style_id))
 
 
+        # New styles.xml loaded, so anything already cached is out of date
+        style_registry.invalidate()
+
         if style_additions > 0:
             print(f"[{style_additions}] Styles loaded into database")
 
@@ -469,63 +715,65 @@ class MinioUSXUpload:
         self.createVerses(file_sections[0])
         self.createExcludedVerses(file_sections[2])
     
+    def load_book_codes(self):
+        # bible.books never changes during an import, so only read it once
+        if self.book_codes == None:
+            self.cur.execute("""
+                SELECT code FROM bible.books;
+            """)
+            self.book_codes = {row[0] for row in self.cur.fetchall()}
+
+        return self.book_codes
+
     def createExcludedVerses(self, section_text):
-        additions = 0
+        excluded_verses = []
         # Create list of excluded verses
         for line in section_text.splitlines():
             if line.startswith("#! -"):
                 verse_ref = line[4:].strip()
                 book_code = verse_ref[0:3]
 
-                self.cur.execute("""
-                    SELECT id FROM bible.books WHERE code=%s
-                """, (book_code,))
-                valid_book = self.cur.fetchone()
-
-                if valid_book == None:
+                if book_code not in self.load_book_codes():
                     continue
 
-                self.cur.execute("""
-                    INSERT INTO bible.excludedverses (verse_ref, translation_id) 
-                    VALUES (%s, %s)
-                """, (verse_ref, self.translation_id))
-                additions += 1
+                excluded_verses.append((verse_ref, self.translation_id))
+
+        # Replace any excluded verses from an earlier run of this import
+        self.cur.execute("""
+            DELETE FROM bible.excludedverses WHERE translation_id = %s;
+        """, (self.translation_id,))
+
+        if excluded_verses:
+            insert_rows(self.cur, "bible.excludedverses", ("verse_ref", "translation_id"), excluded_verses)
+            print(f"[{len(excluded_verses)}] Excluded Verses added to database")
 
-        if additions > 0:
-            print(f"[{additions}] Excluded Verses added to database")
-    
     def createVerses(self, section_text):
-        additions = 0
-        # Create all Verses Tables instances - different from VerseOccurences, just chceck they all exist
+        # Every verse in the versification, e.g. "GEN 1:31 2:25 ..." => GEN 1:1 to GEN 1:31, GEN 2:1 to GEN 2:25, ...
+        versification = []
         for line in section_text.splitlines():
             sections = line.split(" ")
             book_code = sections[0]
 
-            self.cur.execute("""
-                SELECT id FROM bible.books WHERE code=%s
-            """, (book_code,))
-            book_id = self.cur.fetchone()
-
-            if book_id == None:
+            if book_code not in self.load_book_codes():
                 continue
 
             for chapter in range(1,len(sections)):
                 chapter_num, verse_count = sections[chapter].split(":")
+                chapter_ref = book_code + " " + chapter_num
                 for verse in range(1, (int(verse_count)+1)):
-                    chapter_ref = book_code + " " + chapter_num
-                    verse_ref = chapter_ref + ":" + str(verse)
+                    versification.append((chapter_ref, chapter_ref + ":" + str(verse)))
 
-                    self.cur.execute("""
-                        SELECT id FROM bible.verses WHERE verse_ref=%s
-                    """, (verse_ref,))
-                    verse_id = self.cur.fetchone()
-
-                    if verse_id == None:
-                        self.cur.execute("""
-                            INSERT INTO bible.verses (chapter_ref, verse_ref) 
-                            VALUES (%s, %s)
-                        """, (chapter_ref, verse_ref))
-                        additions += 1
-        
-        if additions > 0:
-            print(f"[{additions}] Verses Initialized into database")
\ No newline at end of file
+        # Create all Verses Tables instances - different from VerseOccurences, just check they all exist
+        #       Existing verses are read once and only the missing ones are written, so a translation
+        #       sharing an already loaded versification doesn't write anything. A .vrs can list a verse twice,
+        #       and another worker can add the same verses in the meantime, so those are skipped on conflict.
+        self.cur.execute("""
+            SELECT verse_ref FROM bible.verses;
+        """)
+        existing_verses = {row[0] for row in self.cur.fetchall()}
+
+        missing_verses = [verse for verse in dict.fromkeys(versification) if verse[1] not in existing_verses]
+
+        if missing_verses:
+            insert_rows(self.cur, "bible.verses", ("chapter_ref", "verse_ref"), missing_verses, "ON CONFLICT (verse_ref) DO NOTHING")
+            print(f"[{len(missing_verses)}] Verses Initialized into database")
@@ -0,0 +1,187 @@
+from spacy.tokenizer import Tokenizer
+from spacy.util import compile_infix_regex
+import spacy
+import sys
+import re
+import time
+
+try:
+    import resource # Not available on Windows
+except ImportError:
+    resource = None
+
+# Spacy packages need to be installed, so need to account for storage space for these:
+# To Install a package run the following command:
+#       python3 -m spacy download en_core_web_lg 
+
+# Where "en" can be replaced by any other language code below => See also https://spacy.io/usage/models#section-languages 
+# where "lg" can be replaced by ["sm" ,"md", "lg", "trf"] => See https://spacy.io/models/en
+
+# Hebrew has no trained packages so no tokenisation
+# Need to change map to consider this
+# Add Validation to check for existence of key
+
+# mapping of language name to spacy equivalent for package import - only for supported languages
+language_code_map = {
+    "Catalan": "ca",
+    "Chinese": "zh",
+    "Croatian": "hr",
+    "Danish": "da",
+    "Dutch": "nl",
+    "English": "en",            # ENGLISH
+    "Finnish": "fi",
+    "French": "fr",
+    "German": "de",
+    "Greek": "el",              # GREEK
+    "Italian": "it",
+    "Japanese": "ja",
+    "Korean": "ko",
+    "Lithuanian": "lt",
+    "Macedonian": "mk",
+    "Multi-language": "xx",
+    "Norwegian Bokmål": "nb",
+    "Polish": "pl",
+    "Portuguese": "pt",
+    "Romanian": "ro",
+    "Russian": "ru",
+    "Slovenian": "sl",
+    "Spanish": "es",
+    "Swedish": "sv",
+    "Ukrainian": "uk",
+    "Afrikaans": "af",
+    "Albanian": "sq",
+    "Amharic": "am",
+    "Ancient Greek": "grc",     # ANCIENT GREEK
+    "Greek, Ancient": "grc",    # ANCIENT GREEK
+    "Arabic": "ar",
+    "Armenian": "hy",
+    "Azerbaijani": "az",
+    "Basque": "eu",
+    "Bengali": "bn",
+    "Bulgarian": "bg",
+    "Czech": "cs",
+    "Estonian": "et",
+    "Faroese": "fo",
+    "Gujarati": "gu",
+    "Hebrew": "he",             # HEBREW
+    "Hindi": "hi",
+    "Hungarian": "hu",
+    "Icelandic": "is",
+    "Indonesian": "id",
+    "Irish": "ga",
+    "Kannada": "kn",
+    "Kyrgyz": "ky",
+    "Latin": "la",
+    "Latvian": "lv",
+    "Ligurian": "lij",
+    "Lower Sorbian": "dsb",
+    "Luganda": "lg",
+    "Luxembourgish": "lb",
+    "Malay": "ms",
+    "Malayalam": "ml",
+    "Marathi": "mr",
+    "Nepali": "ne",
+    "Norwegian Nynorsk": "nn",
+    "Persian": "fa",
+    "Sanskrit": "sa",
+    "Serbian": "sr",
+    "Setswana": "tn",
+    "Sinhala": "si",
+    "Slovak": "sk",
+    "Tagalog": "tl",
+    "Tamil": "ta",
+    "Tatar": "tt",
+    "Telugu": "te",
+    "Thai": "th",
+    "Tigrinya": "ti",
+    "Turkish": "tr",
+    "Upper Sorbian": "hsb",
+    "Urdu": "ur",
+    "Vietnamese": "vi",
+    "Yoruba": "yo"
+}
+
+# spaCy pipelines take seconds and hundreds of MB to load, so each one is loaded once per process and shared
+#       by every chapter (and translation) in that language. The tokenizer with a translation's LDML punctuation
+#       is built once per translation and swapped in when that translation is tokenized.
+
+# Pipeline components tokenization never reads (lemma, pos, tag and dep need the rest)
+unused_components = ["ner"]
+
+class NLPRegistry:
+    def __init__(self, package_size="lg"):
+        self.package_size = package_size # "sm", "md", "lg" or "trf", see https://spacy.io/models/en
+        self.models = {}            # language code => Language, or None if the package isn't installed
+        self.default_tokenizers = {} # language code => the package's own tokenizer, custom ones are built from it
+        self.tokenizers = {}        # translation_id => Tokenizer with that translation's punctuation
+
+    def load(self, language_code):
+        # Returns the pipeline for this language, or None if its package isn't installed
+        if language_code in self.models:
+            return self.models[language_code]
+
+        package = f"{language_code}_core_web_{self.package_size}"
+        start_time = time.time()
+        try:
+            nlp = spacy.load(package, exclude=unused_components)
+        except Exception as e:
+            print(f"⚠️ spaCy package {package} could not be loaded, skipping tokenisation: {e}")
+            nlp = None
+
+        if nlp != None:
+            self.default_tokenizers[language_code] = nlp.tokenizer
+            print(f"✅ Loaded {package} in {round(time.time() - start_time, 2)} seconds, peak RSS {peak_rss_mb()} MB")
+
+        self.models[language_code] = nlp
+        return nlp
+
+    def pipeline(self, language_code, translation_id, load_punctuation):
+        # Pipeline for a translation, with its tokenizer in place. load_punctuation() is only called the first time
+        #       a translation is seen, and returns the extra punctuation from its LDML file.
+        nlp = self.load(language_code)
+        if nlp == None:
+            return None
+
+        if translation_id not in self.tokenizers:
+            self.tokenizers[translation_id] = self.createTokenizer(nlp, language_code, load_punctuation())
+
+        nlp.tokenizer = self.tokenizers[translation_id]
+        return nlp
+
+    def createTokenizer(self, nlp, language_code, punctuation):
+        default_tokenizer = self.default_tokenizers[language_code]
+
+        # Extract existing infix patterns
+        custom_infixes = list(nlp.Defaults.infixes)
+
+        # Add new punctuation from LDML (e.g., em dash)
+        for punc in punctuation:
+            custom_infixes.append(re.escape(punc))
+
+        custom_infixes.append(re.escape("±")) # Added to represet notes replaced in document
+
+        # Compile new regex
+        infix_re = compile_infix_regex(custom_infixes)
+
+        # Customises NLP object to include new punctuation for better tokenization
+        return Tokenizer(
+            nlp.vocab,
+            rules=nlp.Defaults.tokenizer_exceptions,
+            prefix_search=default_tokenizer.prefix_search,
+            suffix_search=default_tokenizer.suffix_search,
+            infix_finditer=infix_re.finditer,
+            token_match=default_tokenizer.token_match
+        )
+
+def peak_rss_mb():
+    # Peak resident memory of this process, None where it can't be read
+    if resource == None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak = peak / 1024 # bytes on macOS, KB on Linux
+    return round(peak / 1024, 1)
+
+# Process wide registry, shared by every chapter tokenised in this process
+nlp_registry = NLPRegistry()
@@ -0,0 +1,103 @@
+from psycopg2.extras import execute_values
+from contextlib import nullcontext
+import io
+
+# psycopg 3 is optional, psycopg2 stays the default (POSTGRES_BACKEND=psycopg in connectionpool switches over)
+try:
+    import psycopg
+    from psycopg import pq
+except ImportError:
+    psycopg = None
+
+# The few writes that differ between psycopg2 and psycopg 3, so the rest of the ingestor uses the same
+#       calls whichever driver the connection came from. With psycopg 3:
+#       - pipeline() sends statements without waiting on each one, only a fetch (e.g. RETURNING id) waits,
+#         so a chapter's SAVEPOINT, inserts and RELEASE go out in a few round trips instead of one each
+#       - copy_rows uses binary COPY, or a pipelined INSERT while a pipeline is open, since COPY can't run in one
+#       - insert_rows uses executemany, which psycopg 3 pipelines by itself
+
+def is_psycopg3(cur):
+    # Works on a connection or a cursor
+    return psycopg != None and isinstance(cur, (psycopg.Connection, psycopg.Cursor))
+
+def in_pipeline(cur):
+    conn = cur.connection if isinstance(cur, psycopg.Cursor) else cur
+    return conn.pgconn.pipeline_status != pq.PipelineStatus.OFF
+
+def pipeline(conn):
+    # Context manager, does nothing for psycopg2
+    if is_psycopg3(conn):
+        return conn.pipeline()
+    return nullcontext()
+
+def insert_rows(cur, table, columns, rows, conflict=""):
+    # Multi-row INSERT, conflict is an optional ON CONFLICT clause
+    if is_psycopg3(cur):
+        cur.executemany(f"""
+            INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join(["%s"] * len(columns))}) {conflict}
+        """, rows)
+        return
+
+    execute_values(cur, f"""
+        INSERT INTO {table} ({", ".join(columns)}) VALUES %s {conflict}
+    """, rows, page_size=1000)
+
+def copy_rows(cur, table, columns, rows):
+    # Writes all rows with a single COPY FROM STDIN
+    if is_psycopg3(cur):
+        if in_pipeline(cur):
+            insert_rows(cur, table, columns, rows)
+        else:
+            copy_rows_psycopg3(cur, table, columns, rows)
+        return
+
+    data = io.StringIO()
+    for row in rows:
+        data.write(",".join(copy_value(value) for value in row) + "\n")
+    data.seek(0)
+
+    cur.copy_expert(f"""
+        COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)
+    """, data)
+
+def copy_value(value):
+    # In csv format an unquoted empty value is NULL, everything else is quoted so empty strings stay empty
+    if value == None:
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+# (table, columns) => column type oids, or None when a column (e.g. xml) has no binary dumper and text COPY is used
+copy_types = {}
+
+def copy_rows_psycopg3(cur, table, columns, rows):
+    key = (table, columns)
+    if key not in copy_types:
+        copy_types[key] = binary_copy_types(cur, table, columns)
+    types = copy_types[key]
+
+    if types == None:
+        with cur.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+        return
+
+    with cur.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN (FORMAT BINARY)") as copy:
+        copy.set_types(types)
+        for row in rows:
+            copy.write_row(row)
+
+def binary_copy_types(cur, table, columns):
+    # Binary COPY needs the exact type of every column, looked up once per table
+    cur.execute("""
+        SELECT attname, atttypid FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped;
+    """, (table,))
+    column_types = dict(cur.fetchall())
+
+    types = [column_types[column] for column in columns]
+    for oid in types:
+        try:
+            cur.adapters.get_dumper_by_oid(oid, pq.Format.BINARY)
+        except psycopg.ProgrammingError:
+            return None
+    return types
@@ -0,0 +1,51 @@
+from pgbackend import insert_rows
+
+# Every strongs code already in bible.strongs, loaded once so tagged words don't each need a lookup.
+#       Unseen codes are collected per chapter and written with one INSERT ... ON CONFLICT DO NOTHING.
+
+class StrongsCache:
+    def __init__(self):
+        self.codes = None
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, cur):
+        if self.codes != None:
+            return self
+
+        cur.execute("""
+            SELECT code FROM bible.strongs;
+        """)
+        self.codes = {row[0] for row in cur.fetchall()}
+        return self
+
+    def ensure(self, cur, strong_codes):
+        # Makes sure every code exists in bible.strongs before any occurence referencing it is written
+        new_codes = []
+        for strong_code in strong_codes:
+            if strong_code in self.codes:
+                self.hits += 1
+                continue
+
+            self.misses += 1
+            self.codes.add(strong_code)
+            new_codes.append((strong_code, strong_language(strong_code)))
+
+        if new_codes:
+            insert_rows(cur, "bible.strongs", ("code", "language_id"), new_codes, "ON CONFLICT (code) DO NOTHING")
+
+        return len(new_codes)
+
+    def invalidate(self):
+        self.codes = None
+
+def strong_language(strong_code):
+    # check what language the code belongs to
+    if strong_code[0:1] == "G": # Greek
+        return 4
+    elif strong_code[0:1] == "H": # Hebrew
+        return 2
+    return None
+
+# Process wide cache, shared by every import in this process
+strongs_cache = StrongsCache()
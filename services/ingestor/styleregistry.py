@@ -0,0 +1,37 @@
+# bible.styles is tiny and only changes when a new styles.xml is loaded, so it is read once into memory
+#       instead of being queried for every paragraph and verse.
+
+class StyleRegistry:
+    def __init__(self):
+        self.styles = None      # style => (id, versetext, publishable)
+        self.versetext = {}     # style => versetext, for USXVerse.getText
+
+    def load(self, cur):
+        # Only hits the database the first time, or after the registry was invalidated
+        if self.styles != None:
+            return self
+
+        cur.execute("""
+            SELECT id, style, versetext, publishable FROM bible.styles ORDER BY id;
+        """)
+
+        self.styles = {}
+        for style_id, style, versetext, publishable in cur.fetchall():
+            # Same as the previous WHERE style=%s lookup, the first matching style wins
+            self.styles.setdefault(style, (style_id, versetext, publishable))
+
+        self.versetext = {style: info[1] for style, info in self.styles.items()}
+
+        print(f"[{len(self.styles)}] Styles loaded into registry")
+        return self
+
+    def get(self, style):
+        # Returns (id, versetext, publishable), or (None, False, None) for styles not in the database
+        return self.styles.get(style, (None, False, None))
+
+    def invalidate(self):
+        self.styles = None
+        self.versetext = {}
+
+# Process wide registry, shared by every import in this process
+style_registry = StyleRegistry()
@@ -0,0 +1,536 @@
+from bs4 import BeautifulSoup, Tag, NavigableString
+from pathlib import Path
+from minio import Minio
+import argparse
+import time
+import os
+
+from writebuffer import WriteBuffer
+from nlpregistry import nlp_registry, language_code_map
+from lemmacache import lemma_cache
+from connectionpool import db_pool
+
+from dotenv import load_dotenv
+
+# Automatically find the project root (folder containing .env)
+current = Path(__file__).resolve()
+for parent in current.parents:
+    if (parent / ".env").exists():
+        load_dotenv(parent / ".env")
+        break
+
+MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT")
+MINIO_USERNAME = os.getenv("MINIO_USERNAME")
+MINIO_PASSWORD = os.getenv("MINIO_PASSWORD")
+
+TOKENIZE_PROCESSES = int(os.getenv("INGEST_TOKENIZE_PROCESSES", "1"))
+
+# Opening quote => the closing quote that ends it
+quote_pairs = {"“": "”", "‘": "’"}
+
+# Tokenises a translation from the paragraphs already stored for it, separately from the XML ingest, so it can be
+#       (re)run at any time. Every chapter of the translation is streamed through nlp.pipe in batches (and across
+#       n_process processes), each book's tokens, quotes and notes are replaced and committed together.
+#       Notes are added even for languages without a spaCy package, since they don't depend on tokens.
+#       Usage: python tokenstage.py <translation_id> [<translation_id> ...] [--all] [--n-process 4] [--batch-size 16]
+
+class TokenChapter:
+    def __init__(self, book_map_id, book_code, file_id, chapter_ref, spans, notes, verse_occ_ids):
+        self.book_map_id = book_map_id
+        self.book_code = book_code
+        self.file_id = file_id          # Book file notes are linked to
+        self.chapter_ref = chapter_ref
+        self.spans = spans              # [(start, end, paragraph_id, verse_ref, verse_start)], see build_chapter_text
+        self.notes = notes              # [(style, verse_ref, xml, text, [ref locations])]
+        self.verse_occ_ids = verse_occ_ids # verse_ref => bible.verseoccurences id for this chapter
+
+class TokenStage:
+    def __init__(self, minio_client, translation_id, n_process=TOKENIZE_PROCESSES, batch_size=16, flush_size=5000):
+        self.client = minio_client
+        self.translation_id = translation_id
+        self.n_process = n_process
+        self.batch_size = batch_size
+        self.language_id = None
+        self.known_verses = None # Every verse_ref in bible.verses, cross references to anything else are skipped
+
+        self.conn = db_pool.getconn()
+        self.cur = self.conn.cursor()
+        self.read_cur = self.conn.cursor() # Reads chapters while nlp.pipe is consuming them
+        self.write_buffer = WriteBuffer(self.conn, flush_size)
+
+    def run(self):
+        start_time = time.time()
+
+        # Cache is shared by the whole process, so keep where the counters started for this translation's summary
+        lemma_hits, lemma_misses = lemma_cache.hits, lemma_cache.misses
+        try:
+            tokens = self.createTokenisation()
+        except Exception:
+            # Lemmas added by the book that failed were rolled back too, so the cache has to be read again
+            self.conn.rollback()
+            self.write_buffer.discard()
+            lemma_cache.invalidate()
+            raise
+        finally:
+            self.cur.close()
+            self.read_cur.close()
+            db_pool.putconn(self.conn)
+
+        duration = round(time.time() - start_time, 2)
+        print(f"✅ Tokenised Translation {self.translation_id}: [{tokens}] Tokens in {duration} seconds!")
+        print(f"    Lemma cache: [{lemma_cache.hits - lemma_hits}] hits, [{lemma_cache.misses - lemma_misses}] misses")
+        return tokens
+
+    def getLanguageCode(self):
+        # Figure out language code and if supported by spacy for tokenisation
+        self.cur.execute("""
+            SELECT l.id, l.name FROM bible.translations t
+            JOIN bible.translationinfo i ON i.dbl_id = t.dbl_id
+            JOIN bible.languages l ON l.id = i.language_id
+            WHERE t.id = %s;
+        """, (self.translation_id,))
+        language = self.cur.fetchone()
+
+        if language == None:
+            return None
+
+        self.language_id = language[0]
+        return language_code_map.get(language[1])
+
+    def loadLanguageLDML(self):
+        # Punctuation listed in the translation's LDML file, read from the bucket it was uploaded to
+        self.cur.execute("""
+            SELECT f.bucket, f.file_path FROM bible.translations t
+            JOIN bible.files f ON f.id = t.ldml_file
+            WHERE t.id = %s;
+        """, (self.translation_id,))
+        ldml_file = self.cur.fetchone()
+
+        if ldml_file == None:
+            return []
+
+        response = None
+        try:
+            response = self.client.get_object(bucket_name=ldml_file[0], object_name=ldml_file[1])
+            ldml_content = BeautifulSoup(response.read(), 'xml')
+        finally:
+            if response:
+                response.close()
+                response.release_conn()
+
+        # Extract punctuation tag from file
+        punctuation_element = ldml_content.find('exemplarCharacters', {'type': 'punctuation'})
+
+        if punctuation_element:
+            # Get the text content which contains the punctuation in brackets
+            return parse_ldml_punctuation(punctuation_element.get_text())
+
+        return [] # list of punctuation marks
+
+    def createTokenisation(self):
+        language_code = self.getLanguageCode()
+
+        # if supported, then get the (already loaded) spacy pipeline with this translation's tokenizer
+        nlp = None
+        if language_code != None:
+            nlp = nlp_registry.pipeline(language_code, self.translation_id, self.loadLanguageLDML)
+        else:
+            print(f"⚠️ Translation {self.translation_id} has no spaCy language, only adding notes")
+
+        self.cur.execute("""
+            SELECT verse_ref FROM bible.verses;
+        """)
+        self.known_verses = {row[0] for row in self.cur.fetchall()}
+
+        total = 0
+        book_tokens = 0
+        current_book = None
+
+        # Chapters are read lazily, book by book, so only the batches nlp.pipe is working on are held in memory
+        if nlp != None:
+            lemma_cache.load(self.cur, self.language_id)
+            docs = nlp.pipe(self.chapterTexts(), as_tuples=True, batch_size=self.batch_size, n_process=self.n_process)
+        else:
+            docs = ((None, chapter) for chapter_text, chapter in self.chapterTexts())
+
+        for doc, chapter in docs:
+            if current_book == None or chapter.book_map_id != current_book.book_map_id:
+                if current_book != None:
+                    self.finishBook(current_book.book_code, book_tokens)
+                self.clearBook(chapter)
+                current_book, book_tokens = chapter, 0
+
+            self.createNotes(chapter)
+
+            if doc != None:
+                additions = self.createTokens(doc, chapter)
+                book_tokens += additions
+                total += additions
+
+        if current_book != None:
+            self.finishBook(current_book.book_code, book_tokens)
+
+        return total
+
+    def chapterTexts(self):
+        # Yields (chapter_text, TokenChapter) for every chapter, in order
+        self.read_cur.execute("""
+            SELECT id, book_code, file_id FROM bible.booktofile WHERE translation_id = %s ORDER BY id;
+        """, (self.translation_id,))
+        books = self.read_cur.fetchall()
+
+        for book_map_id, book_code, file_id in books:
+            # Every paragraph is read for verses and notes, only the ones with verse text are tokenised
+            self.read_cur.execute("""
+                SELECT co.chapter_ref, p.id, p.xml, p.versetext <> '' FROM bible.chapteroccurences co
+                JOIN bible.paragraphs p ON p.chapter_occ_id = co.id
+                WHERE co.book_map_id = %s
+                ORDER BY co.id, p.id;
+            """, (book_map_id,))
+
+            chapters = {}
+            for chapter_ref, paragraph_id, paragraph_xml, versetext in self.read_cur.fetchall():
+                chapters.setdefault(chapter_ref, []).append((paragraph_id, paragraph_xml, versetext))
+
+            self.read_cur.execute("""
+                SELECT co.chapter_ref, vo.verse_ref, vo.id FROM bible.chapteroccurences co
+                JOIN bible.verseoccurences vo ON vo.chapter_occ_id = co.id
+                WHERE co.book_map_id = %s;
+            """, (book_map_id,))
+
+            verse_occ_ids = {}
+            for chapter_ref, verse_ref, verse_occ_id in self.read_cur.fetchall():
+                verse_occ_ids.setdefault(chapter_ref, {})[verse_ref] = verse_occ_id
+
+            for chapter_ref, paragraphs in chapters.items():
+                chapter_text, spans, notes = build_chapter_text(paragraphs)
+                yield chapter_text, TokenChapter(
+                    book_map_id, book_code, file_id, chapter_ref, spans, notes, verse_occ_ids.get(chapter_ref, {})
+                )
+
+    def clearBook(self, chapter):
+        # Everything from an earlier run is replaced, in the same transaction as the new rows. Quotes first, since
+        #       they reference their occurences.
+        book_paragraphs = """
+            SELECT p.id FROM bible.paragraphs p
+            JOIN bible.chapteroccurences co ON co.id = p.chapter_occ_id
+            WHERE co.book_map_id = %s
+        """
+        self.cur.execute(f"""
+            DELETE FROM bible.quotes WHERE quote_start IN (
+                SELECT id FROM bible.occurences WHERE type = 'quote' AND paragraph_id IN ({book_paragraphs})
+            );
+        """, (chapter.book_map_id,))
+        self.cur.execute(f"""
+            DELETE FROM bible.occurences WHERE type = 'quote' AND paragraph_id IN ({book_paragraphs});
+        """, (chapter.book_map_id,))
+        self.cur.execute(f"""
+            DELETE FROM bible.tokens WHERE paragraph_id IN ({book_paragraphs});
+        """, (chapter.book_map_id,))
+
+        # Notes belong to the book's file, readers find them through booktofile.file_id
+        self.cur.execute("""
+            DELETE FROM bible.translationfootnotes WHERE file_id = %s;
+        """, (chapter.file_id,))
+        self.cur.execute("""
+            DELETE FROM bible.translationrefnotes WHERE file_id = %s;
+        """, (chapter.file_id,))
+
+    def finishBook(self, book_code, additions):
+        self.write_buffer.flush()
+        self.conn.commit()
+        print(f"[{additions}] Tokens added for {book_code}")
+
+    def createNotes(self, chapter):
+        for note_type, verse_ref, note_xml, note_text, ref_locations in chapter.notes:
+            if verse_ref not in self.known_verses:
+                verse_ref = None # e.g. notes in a book's introduction, before the first verse
+
+            if note_type == "f":
+                self.write_buffer.add("bible.translationfootnotes", (chapter.file_id, verse_ref, note_xml, note_text))
+            elif note_type == "x":
+                for to_ref in ref_locations:
+                    split_ref = to_ref.split("-")
+                    # ISA 28:11-12
+                    to_verse_start = split_ref[0] # ISA 28:11
+                    to_verse_end = None if len(split_ref) == 1 else to_verse_start.split(":")[0] + ":" + split_ref[1] # "ISA 28" + ":" + 12
+
+                    # Whole chapters (ISA 28) or ranges across chapters (ISA 28:11-29:2) aren't single verses
+                    if to_verse_start not in self.known_verses:
+                        continue
+                    if to_verse_end not in self.known_verses:
+                        to_verse_end = None
+
+                    self.write_buffer.add("bible.translationrefnotes", (chapter.file_id, verse_ref, to_verse_start, to_verse_end, note_xml))
+
+    def createTokens(self, doc, chapter):
+        # Paragraph breaks and note placeholders were only added to the text to tokenise it, they aren't tokens
+        tokens = [token for token in doc if not token.is_space and token.text != "±"]
+
+        # Ids are reserved up front, so a token can reference its head before either is written
+        token_ids = dict(zip((token.i for token in tokens), self.write_buffer.reserve_ids("bible.tokens", len(tokens))))
+
+        token_spans = map_spans([token.idx for token in tokens], chapter.spans)
+
+        # Only words get a lemma, any the language doesn't have yet are added for the whole chapter at once
+        lemma_cache.ensure(self.cur, self.language_id, {token.lemma_ for token in tokens if has_lemma(token)})
+
+        rows = []
+        for token, (token_paragraph_id, token_verse_ref, token_verse_offset) in zip(tokens, token_spans):
+            llema_id = lemma_cache.get(self.language_id, token.lemma_) if has_lemma(token) else None
+
+            rows.append((
+                token_ids[token.i], token.text, llema_id, token_paragraph_id, token_verse_ref,
+                token.pos_, token.tag_, token.dep_, token_ids.get(token.head.i),
+                len(token.whitespace_) > 0, token.is_alpha, token.is_punct, token.like_num
+            ))
+
+        # Heads can come after the token, so the whole chapter is buffered at once
+        self.write_buffer.extend("bible.tokens", rows)
+
+        self.createQuotes(doc, chapter, tokens, token_spans)
+
+        return len(tokens)
+
+    def createQuotes(self, doc, chapter, tokens, token_spans):
+        # An opening quote is matched with the next closing quote of the same kind, a quote opened inside another
+        #       one gets it as its parent. A ’ without an open ‘ is an apostrophe. Quotes still open at the end of
+        #       the chapter are kept without an end.
+        quotes = []         # [start token index, end token index, parent quote index]
+        open_quotes = []    # Indexes into quotes, innermost last
+        for index, token in enumerate(tokens):
+            if token.text in quote_pairs:
+                quotes.append([index, None, open_quotes[-1] if open_quotes else None])
+                open_quotes.append(len(quotes) - 1)
+                continue
+
+            for position in range(len(open_quotes) - 1, -1, -1):
+                quote = quotes[open_quotes[position]]
+                if quote_pairs[tokens[quote[0]].text] == token.text:
+                    quote[1] = index
+                    del open_quotes[position:] # Anything opened inside it and never closed ends here too
+                    break
+
+        if not quotes:
+            return
+
+        occurence_ids = iter(self.write_buffer.reserve_ids("bible.occurences", sum(2 if end != None else 1 for start, end, parent in quotes)))
+        quote_ids = self.write_buffer.reserve_ids("bible.quotes", len(quotes))
+
+        occurences = []
+        quote_rows = []
+        for quote_id, (start, end, parent) in zip(quote_ids, quotes):
+            quote_start = self.createQuoteOccurence(occurences, next(occurence_ids), chapter, tokens[start], token_spans[start])
+            quote_end = None
+            text_end = len(doc.text)
+            if end != None:
+                quote_end = self.createQuoteOccurence(occurences, next(occurence_ids), chapter, tokens[end], token_spans[end])
+                text_end = tokens[end].idx + len(tokens[end].text)
+
+            quote_rows.append((
+                quote_id, doc.text[tokens[start].idx:text_end], quote_start, quote_end,
+                quote_ids[parent] if parent != None else None
+            ))
+
+        self.write_buffer.extend("bible.occurences", occurences)
+        self.write_buffer.extend("bible.quotes", quote_rows)
+
+    def createQuoteOccurence(self, occurences, occurence_id, chapter, token, token_span):
+        # Offsets are into the verse's text (bible.verseoccurences.text), not the chapter text that was tokenised
+        paragraph_id, verse_ref, start_char = token_span
+        end_char = start_char + len(token.text) if start_char != None else None
+
+        occurences.append((
+            occurence_id, token.text, "quote", chapter.verse_occ_ids.get(verse_ref),
+            start_char, end_char, paragraph_id
+        ))
+        return occurence_id
+
+def build_chapter_text(paragraphs):
+    # Joins the text of a chapter's paragraphs [(paragraph_id, xml, versetext)] into one block for tokenisation,
+    #       only paragraphs with versetext add text. Returns (chapter_text, spans, notes), spans
+    #       [(start, end, paragraph_id, verse_ref, verse_start)] tell which paragraph and verse each character offset
+    #       belongs to, and where the span starts in the verse's text (see verse_text_starts).
+    #       Every note in verse text is replaced with a single "±", notes [(style, verse_ref, xml, text, [ref locations])].
+    text_mapping = []   # [(text, paragraph_id, verse_ref, offset into the paragraph's text of the verse)], None for notes
+    verse_parts = {}    # (paragraph_id, verse_ref) => text of the verse in that paragraph
+    notes = []
+    verse_ref = None
+
+    for paragraph_id, paragraph_xml, versetext in paragraphs:
+        para = BeautifulSoup(paragraph_xml, "xml").find("para")
+        para_text_mapping = []
+
+        for elem in para.descendants:
+            if elem.name == "verse":
+                # update current verse context
+                verse_ref = elem.get("sid")
+
+            # Handle notes: store, mark where they were, then skip adding to snippet
+            if isinstance(elem, Tag) and elem.name == "note":
+                notes.append(read_note(elem, verse_ref))
+                if versetext:
+                    para_text_mapping.append(("±", paragraph_id, verse_ref, None))
+
+            if elem.name == "note" or elem.find_parent("note") or not versetext:
+                continue
+
+            elif isinstance(elem, NavigableString):
+                # Whitespace between elements is kept, it is part of the verse's text too
+                text = str(elem)
+                verse_part = verse_parts.get((paragraph_id, verse_ref), "")
+                verse_parts[(paragraph_id, verse_ref)] = verse_part + text
+
+                if para_text_mapping and para_text_mapping[-1][1:3] == (paragraph_id, verse_ref) and para_text_mapping[-1][3] != None:
+                    # merge with previous, unless it is a note
+                    prev_text, _, _, part_offset = para_text_mapping[-1]
+                    para_text_mapping[-1] = (prev_text + text, paragraph_id, verse_ref, part_offset)
+                else:
+                    para_text_mapping.append((text, paragraph_id, verse_ref, len(verse_part)))
+
+        text_mapping.extend(para_text_mapping)
+
+    part_starts = verse_text_starts(verse_parts)
+
+    chapter_text = ""
+    spans = []  # [(start, end, para_id, verse_ref, verse_start)]
+
+    last_para_id = None
+
+    for text, para_id, verse_ref, part_offset in text_mapping:
+        if last_para_id != None and last_para_id != para_id:
+            chapter_text += "\n" # Paragraph break, skipped when creating tokens
+        last_para_id = para_id
+
+        verse_start = None
+        if part_offset != None and part_starts.get((para_id, verse_ref)) != None:
+            verse_start = part_starts[(para_id, verse_ref)] + part_offset
+
+        start = len(chapter_text)
+        chapter_text += text
+        end = len(chapter_text)
+        spans.append((start, end, para_id, verse_ref, verse_start))
+
+    return chapter_text, spans, notes
+
+def verse_text_starts(verse_parts):
+    # Where the text of a verse in each paragraph {(paragraph_id, verse_ref) => text} starts in the verse's text,
+    #       which USXVerse.getText builds by stripping each paragraph's part and joining them with a " ".
+    #       The start is before any whitespace the part is stripped of, so offsets into the part can be added to it.
+    verse_lengths = {}  # verse_ref => length of the verse's text so far
+    part_starts = {}
+
+    for (paragraph_id, verse_ref), text in verse_parts.items():
+        if verse_ref == None or not text.strip():
+            continue
+
+        start = verse_lengths[verse_ref] + 1 if verse_ref in verse_lengths else 0
+        part_starts[(paragraph_id, verse_ref)] = start - (len(text) - len(text.lstrip()))
+        verse_lengths[verse_ref] = start + len(text.strip())
+
+    return part_starts
+
+def read_note(note, verse_ref):
+    # Note as plain values, so chapters can be handed to other processes. The text leaves out the reference
+    #       the note starts with (e.g. "1:1 ")
+    text = "".join(
+        str(string) for string in note.find_all(string=True)
+        if string.find_parent("char") == None or string.find_parent("char").get("style") not in ("fr", "xo")
+    )
+    return (note.get("style"), verse_ref, str(note), text.strip(), [ref.get("loc") for ref in note.find_all("ref")])
+
+def has_lemma(token):
+    return not token.is_punct and token.lemma_ != ""
+
+def map_spans(offsets, spans):
+    # (paragraph_id, verse_ref, offset into the verse's text) for each character offset, (None, None, None) for
+    #       offsets outside every span. The verse offset is None for a note placeholder or text outside a verse.
+    #       Offsets (tokens) and spans are both in text order, so one sweep moving forward through the spans
+    #       resolves all of them, instead of checking every span for every token.
+    mapped = []
+    span_index = 0
+
+    for offset in offsets:
+        while span_index < len(spans) and spans[span_index][1] <= offset:
+            span_index += 1
+
+        if span_index < len(spans) and spans[span_index][0] <= offset:
+            start, end, para_id, verse_ref, verse_start = spans[span_index]
+            mapped.append((para_id, verse_ref, verse_start + offset - start if verse_start != None else None))
+        else:
+            mapped.append((None, None, None))
+
+    return mapped
+
+def parse_ldml_punctuation(exemplar_text):
+    if not exemplar_text.strip():
+        return []
+
+    # Remove outer brackets
+    content = exemplar_text.strip()[1:-1]  # Remove [ and ]
+
+    punctuation_chars = []
+    i = 0
+
+    while i < len(content):
+        char = content[i]
+
+        if char == '\\' and i + 1 < len(content):
+            # Handle escaped characters
+            next_char = content[i + 1]
+            if next_char == 'u' and i + 5 < len(content):
+                # Unicode escape sequence like \u2019
+                unicode_hex = content[i + 2:i + 6]
+                try:
+                    unicode_char = chr(int(unicode_hex, 16))
+                    punctuation_chars.append(unicode_char)
+                    i += 6
+                except ValueError:
+                    punctuation_chars.append(next_char)
+                    i += 2
+            else:
+                # Regular escape like \: or \-
+                punctuation_chars.append(next_char)
+                i += 2
+        elif char == '{' and '}' in content[i:]:
+            # Handle multi-character sequences like {...}
+            end_brace = content.find('}', i)
+            sequence = content[i + 1:end_brace]
+            punctuation_chars.append(sequence) # e.g. "..."
+            i = end_brace + 1
+        elif char not in [' ', '\t', '\n']:
+            # Regular character
+            punctuation_chars.append(char)
+            i += 1
+        else:
+            i += 1
+
+    return punctuation_chars
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tokenise imported translations from their stored paragraphs")
+    parser.add_argument("translation_ids", nargs="*", type=int)
+    parser.add_argument("--all", action="store_true", help="Every translation that finished importing")
+    parser.add_argument("--n-process", type=int, default=int(os.getenv("INGEST_TOKENIZE_PROCESSES", "1")), help="Processes running spaCy")
+    parser.add_argument("--batch-size", type=int, default=16, help="Chapters per nlp.pipe batch")
+    args = parser.parse_args()
+
+    client = Minio(
+        MINIO_ENDPOINT,
+        access_key=MINIO_USERNAME,
+        secret_key=MINIO_PASSWORD,
+        secure=False
+    )
+
+    translation_ids = args.translation_ids
+    if args.all:
+        with db_pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT id FROM bible.translations WHERE imported_at IS NOT NULL ORDER BY id;
+            """)
+            translation_ids = [row[0] for row in cur.fetchall()]
+            cur.close()
+
+    for translation_id in translation_ids:
+        TokenStage(client, translation_id, args.n_process, args.batch_size).run()
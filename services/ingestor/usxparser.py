@@ -0,0 +1,223 @@
+from lxml import etree
+import io
+import re
+
+# Single pass USX walker, replaces slicing the book/chapter string with regex for every chapter.
+# The book is streamed with iterparse, every top level element (book, para, chapter milestone, ...) is
+# handled once when it closes, and then cleared so only the current chapter is ever held in memory.
+
+# Matches verse milestones inside a serialised paragraph e.g. <verse number="1" style="v" sid="GEN 1:1"/>
+verse_milestone_re = re.compile(r"<verse\b[^>]*?/>")
+milestone_attribute_re = re.compile(r'\b(sid|eid)="([^"]*)"')
+
+class USXParagraph:
+    def __init__(self, style, xml):
+        self.style = style
+        self.xml = xml                  # Serialised <para> as found in the book
+        self.text = ""                  # Text content with <note> tags removed
+        self.verse_refs = []            # Verses (sid or eid) found in this paragraph, in order, no duplicates
+        self.verse_text = {}            # verse_ref => text of that verse inside this paragraph (notes removed)
+        self.strongs = []               # [(strong_code, text, xml, verse_ref)] for every <char style="w">
+
+class USXVerse:
+    def __init__(self, verse_ref, para_tag):
+        self.verse_ref = verse_ref
+        self.xml_parts = [para_tag + "\n"]
+        self.text_parts = []            # [(para_style, text)] one entry per paragraph the verse runs through
+        self.start = None               # Offset of the sid milestone, only while still in the paragraph it started
+
+    @property
+    def xml(self):
+        # Opening tag of the paragraph the verse started in, everything from the sid to the eid milestone
+        return "".join(self.xml_parts) + "\n</para>"
+
+    def getText(self, versetext_styles):
+        # Only keep text from paragraphs that are verse text (skips headings, titles, ...) as continuous text
+        texts = [text.strip() for style, text in self.text_parts if versetext_styles.get(style)]
+        return " ".join(text for text in texts if text)
+
+class USXChapter:
+    def __init__(self, chapter_ref):
+        self.chapter_ref = chapter_ref
+        self.paragraphs = []
+        self.verses = []                # USXVerse for every verse that starts (sid) in this chapter, in order
+
+    @property
+    def verse_refs(self):
+        return [verse.verse_ref for verse in self.verses]
+
+    @property
+    def xml(self):
+        # Have to add encapsulating tags, so the chapter can still be parsed as a single xml document
+        chapter_text = """<usx version="3.0">\n"""
+        chapter_text += "\n".join(para.xml for para in self.paragraphs)
+        chapter_text += "\n</usx>"
+        return chapter_text
+
+def parse_book(book_usx):
+    # Parses a whole book at once, used to parse books in worker processes (see MinioUSXUpload.create_books)
+    #       Result is plain python objects, so it can be sent back to the process writing to the database
+    return list(USXParser(book_usx).chapters())
+
+class USXParser:
+    def __init__(self, book_string):
+        if isinstance(book_string, str):
+            book_string = book_string.encode("utf-8")
+        self.book_bytes = book_string
+
+        self.book_code = None
+
+        # Walker state, carried between paragraphs since verses can span more than one paragraph
+        self.current_chapter = None
+        self.current_verse = None
+        self.pending_strongs = [] # Words seen outside of a verse, resolved to the next verse that starts
+        self.chapter_verses = {}  # verse_ref => USXVerse for the current chapter
+        self.open_verses = {}     # Verses whose eid hasn't been reached yet
+
+    def chapters(self):
+        depth = 0
+
+        for event, elem in etree.iterparse(io.BytesIO(self.book_bytes), events=("start", "end"), remove_blank_text=False):
+            if event == "start":
+                depth += 1
+                continue
+
+            depth -= 1
+
+            # Only act on direct children of <usx>, nested elements are handled with their parent
+            if depth != 1:
+                continue
+
+            chapter = self.handleElement(elem)
+            if chapter != None:
+                yield chapter
+
+            # Free everything already processed
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+        # Book ended without a closing chapter milestone
+        if self.current_chapter != None:
+            yield self.closeChapter()
+
+    def handleElement(self, elem):
+        match elem.tag:
+            case "book":
+                self.book_code = elem.get("code")
+            case "chapter":
+                if elem.get("sid") != None:
+                    # A new chapter start also closes one left open
+                    finished = self.closeChapter() if self.current_chapter != None else None
+                    self.current_chapter = USXChapter(elem.get("sid"))
+                    return finished
+                if elem.get("eid") != None and self.current_chapter != None:
+                    return self.closeChapter()
+            case "para":
+                # Paragraphs outside of a chapter (headers, titles, ...) are not part of any chapter
+                if self.current_chapter != None:
+                    self.current_chapter.paragraphs.append(self.createParagraph(elem))
+
+        return None
+
+    def closeChapter(self):
+        chapter = self.current_chapter
+
+        self.current_chapter = None
+        self.current_verse = None
+        self.pending_strongs = []
+        self.chapter_verses = {}
+        self.open_verses = {}
+
+        return chapter
+
+    def createParagraph(self, para):
+        paragraph = USXParagraph(para.get("style"), etree.tostring(para, encoding="unicode", with_tail=False))
+
+        self.sliceVerseXML(paragraph)
+
+        text_parts = []
+        self.walkElement(para, paragraph, text_parts, False)
+        paragraph.text = "".join(text_parts).strip()
+
+        for verse_ref, text in paragraph.verse_text.items():
+            if verse_ref in self.chapter_verses:
+                self.chapter_verses[verse_ref].text_parts.append((paragraph.style, text))
+
+        return paragraph
+
+    def sliceVerseXML(self, paragraph):
+        # Cuts the xml of every verse out of the serialised paragraph, in one pass over its milestones
+        para_xml = paragraph.xml
+        para_tag = para_xml.split(">")[0] + ">"
+
+        for milestone in verse_milestone_re.finditer(para_xml):
+            attributes = dict(milestone_attribute_re.findall(milestone.group(0)))
+
+            if "sid" in attributes:
+                verse = USXVerse(attributes["sid"], para_tag)
+                verse.start = milestone.start()
+                self.open_verses[verse.verse_ref] = verse
+                self.chapter_verses[verse.verse_ref] = verse
+                self.current_chapter.verses.append(verse)
+            elif "eid" in attributes:
+                verse = self.open_verses.pop(attributes["eid"], None)
+                if verse != None:
+                    start = verse.start if verse.start != None else 0
+                    verse.xml_parts.append(para_xml[start:milestone.end()])
+
+        # Verses still open carry on into the next paragraph
+        for verse in self.open_verses.values():
+            start = verse.start if verse.start != None else 0
+            verse.xml_parts.append(para_xml[start:] + "\n")
+            verse.start = None
+
+    def walkElement(self, elem, paragraph, text_parts, in_note):
+        if elem.text and not in_note:
+            self.addText(paragraph, text_parts, elem.text)
+
+        for child in elem:
+            if isinstance(child.tag, str):
+                if child.tag == "verse":
+                    self.handleVerse(child, paragraph)
+                elif child.tag == "char" and child.get("style") == "w" and child.get("strong") != None:
+                    self.createStrong(child, paragraph)
+
+                self.walkElement(child, paragraph, text_parts, in_note or child.tag == "note")
+
+            # The tail after a note is still text
+            if child.tail and not in_note:
+                self.addText(paragraph, text_parts, child.tail)
+
+    def addText(self, paragraph, text_parts, text):
+        text_parts.append(text)
+        if self.current_verse != None:
+            paragraph.verse_text[self.current_verse] = paragraph.verse_text.get(self.current_verse, "") + text
+
+    def handleVerse(self, elem, paragraph):
+        sid = elem.get("sid")
+        eid = elem.get("eid")
+        verse_ref = sid if sid != None else eid
+
+        if verse_ref != None and verse_ref not in paragraph.verse_refs:
+            paragraph.verse_refs.append(verse_ref)
+
+        if sid != None:
+            self.current_verse = sid
+            # Words found before any verse belong to the next verse that starts
+            for strong in self.pending_strongs:
+                strong[3] = sid
+            self.pending_strongs = []
+        elif eid != None:
+            self.current_verse = None
+
+    def createStrong(self, elem, paragraph):
+        strong = [
+            elem.get("strong"),
+            "".join(elem.itertext()),
+            etree.tostring(elem, encoding="unicode", with_tail=False),
+            self.current_verse
+        ]
+        if self.current_verse == None:
+            self.pending_strongs.append(strong)
+        paragraph.strongs.append(strong)
@@ -0,0 +1,67 @@
+from pgbackend import copy_rows
+
+# Tables the ingestor writes in bulk with COPY, in the order they have to be flushed (parents first so foreign
+#       keys hold). table => columns
+ingest_tables = {
+    "bible.paragraphs": ("id", "chapter_occ_id", "style_id", "parent_para", "xml", "versetext"),
+    "bible.versestoparagraphs": ("verse_ref", "paragraph_id"),
+    "bible.strongsoccurence": ("verse_ref", "translation_id", "text", "xml", "strong_code", "paragraph_id"),
+    "bible.verseoccurences": ("chapter_occ_id", "verse_ref", "text", "xml"),
+    "bible.tokens": (
+        "id", "text", "llema_id", "paragraph_id", "verse_ref", "pos", "tag", "dep", "head_token_id",
+        "trailing_space", "is_alpha", "is_punct", "like_num"
+    ),
+    "bible.occurences": ("id", "text", "type", "verse_occ_id", "start_char", "end_char", "paragraph_id"),
+    "bible.quotes": ("id", "text", "quote_start", "quote_end", "parent_quote"),
+    "bible.translationfootnotes": ("file_id", "verse_ref", "xml", "text"),
+    "bible.translationrefnotes": ("file_id", "from_verse_ref", "to_verse_start", "to_verse_end", "xml"),
+}
+
+class WriteBuffer:
+    def __init__(self, db_conn, flush_size=1000):
+        # Adds a database connection
+        self.conn = db_conn
+        self.cur = self.conn.cursor()
+
+        self.flush_size = flush_size
+        self.rows = {table: [] for table in ingest_tables}
+        self.written = {table: 0 for table in ingest_tables}
+
+    def add(self, table, row):
+        self.rows[table].append(row)
+
+        if len(self.rows[table]) >= self.flush_size:
+            self.flush()
+
+    def extend(self, table, rows):
+        # Adds rows that have to be written together, e.g. tokens referencing each other, a flush never splits them
+        self.rows[table].extend(rows)
+
+        if len(self.rows[table]) >= self.flush_size:
+            self.flush()
+
+    def reserve_ids(self, table, count):
+        # Takes ids from the table sequence up front, so rows can be linked to each other before they are written
+        if count == 0:
+            return []
+
+        self.cur.execute("""
+            SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s);
+        """, (table, count))
+        return [row[0] for row in self.cur.fetchall()]
+
+    def discard(self):
+        # Drops everything not written yet, e.g. the rows of a chapter that was rolled back
+        self.rows = {table: [] for table in ingest_tables}
+
+    def flush(self):
+        # Always flush every table (in order) so a child row is never written before the row it references
+        for table, columns in ingest_tables.items():
+            rows = self.rows[table]
+            if not rows:
+                continue
+
+            copy_rows(self.cur, table, columns, rows)
+
+            self.written[table] += len(rows)
+            self.rows[table] = []
@@ -1,29 +1,37 @@
 import psycopg2
-import os
-from dotenv import load_dotenv
-from pathlib import Path
 
-# Automatically find the project root (folder containing .env)
-current = Path(__file__).resolve()
-for parent in current.parents:
-    if (parent / ".env").exists():
-        load_dotenv(parent / ".env")
-        break
+# Shares the ingestor's connection pool (configured from the same .env), services/ingestor has to be on
+#       PYTHONPATH. app.py runs this script with it, or by hand from this folder:
+#       PYTHONPATH=../ingestor python3 init_database.py
+from connectionpool import db_pool
 
-POSTGRES_USERNAME = os.getenv("POSTGRES_USERNAME")
-POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-POSTGRES_DB = os.getenv("POSTGRES_DB")
-POSTGRES_HOST = os.getenv("POSTGRES_HOST")
-POSTGRES_PORT = os.getenv("POSTGRES_PORT")
+# Data loaded once, into a new database
+init_migrations = [
+    "001_init_translations.sql",
+    "002_init_bible.sql"
+]
+
+# Schema changes made since v1_schema.sql, every one of them can be run again. An existing database is brought
+#       up to date by running this script again.
+schema_migrations = [
+    "003_indexes.sql",
+    "004_translations_unique.sql",
+    "005_ingest_jobs.sql",
+    "006_book_checkpoints.sql",
+    "007_strongs_paragraph.sql",
+    "008_llemas.sql"
+]
+
+def run_migrations(cur, migrations):
+    for init_script in migrations:
+        script_path = "../database/server/migrations/" + init_script
+        # Load and execute SQL file
+        with open(script_path, "r", encoding="utf-8") as file:
+            sql_script = file.read()
+            cur.execute(sql_script)
 
 def init_database():
-    conn = psycopg2.connect(
-        host=POSTGRES_HOST,
-        port=POSTGRES_PORT,
-        dbname=POSTGRES_DB,
-        user=POSTGRES_USERNAME,
-        password=POSTGRES_PASSWORD
-    )
+    conn = db_pool.getconn()
 
     cur = conn.cursor()
 
@@ -32,12 +40,17 @@ def init_database():
         SELECT EXISTS (
             SELECT 1
             FROM information_schema.tables 
-            WHERE table_schema = 'public'
+            WHERE table_schema = 'bible'
             AND table_name = %s
         );
     """, ("languages",))
     
+    # v1_schema.sql can't be run twice (CREATE SCHEMA), so an existing database only gets the schema migrations
     if cur.fetchone()[0] == True:
+        run_migrations(cur, schema_migrations)
+        conn.commit()
+        cur.close()
+        db_pool.putconn(conn)
         return "Database Already Initialised!"
 
     # Load and execute SQL file
@@ -45,21 +58,11 @@ def init_database():
         sql_script = file.read()
         cur.execute(sql_script)
 
-    migrations = [
-        "001_init_translations.sql",
-        "002_init_bible.sql"
-    ]
-
-    for init_script in migrations:
-        script_path = "../database/server/migrations/" + init_script
-        # Load and execute SQL file
-        with open(script_path, "r", encoding="utf-8") as file:
-            sql_script = file.read()
-            cur.execute(sql_script)
+    run_migrations(cur, init_migrations + schema_migrations)
 
     conn.commit()
     cur.close()
-    conn.close()
+    db_pool.putconn(conn)
 
     print("Database Init Success")
 
@@ -0,0 +1,34 @@
+from pathlib import Path
+import sys
+
+import psycopg2
+import pytest
+
+# The ingestor's modules import each other by name (it is run from its own folder), so the tests do the same
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "ingestor"))
+
+@pytest.fixture
+def db():
+    # Connection to the database configured in .env (POSTGRES_*), every test is rolled back at the end.
+    #       Tests that need it are skipped when there is no database with the bible schema to run against.
+    from connectionpool import POSTGRES_USERNAME, POSTGRES_PASSWORD, POSTGRES_DB, POSTGRES_HOST, POSTGRES_PORT
+
+    try:
+        conn = psycopg2.connect(
+            user=POSTGRES_USERNAME, password=POSTGRES_PASSWORD, dbname=POSTGRES_DB, host=POSTGRES_HOST, port=POSTGRES_PORT
+        )
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"No database to test against: {e}")
+
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_schema = 'bible' AND table_name = 'booktofile');
+    """)
+    if cur.fetchone()[0] != True:
+        conn.close()
+        pytest.skip("Database doesn't have the bible schema, run scripts/init_database.py first")
+
+    yield conn
+
+    conn.rollback()
+    conn.close()
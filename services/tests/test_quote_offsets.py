@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+from usxparser import USXParser
+from tokenstage import TokenStage, TokenChapter, build_chapter_text, map_spans
+
+# Poetry and prose styles are verse text, section headings aren't
+versetext_styles = {"p": True, "q1": True, "q2": True, "s1": False}
+
+book_usx = """<usx version="3.0">
+<book code="GEN" style="id">Test</book>
+<chapter number="1" style="c" sid="GEN 1"/>
+<para style="s1">A heading</para>
+<para style="p">
+  <verse number="1" style="v" sid="GEN 1:1"/>God said,<note caller="+" style="f"><char style="fr">1:1 </char><char style="ft">Or “spoke”</char></note> <char style="wj">“Let there be light,”</char> and there was light.<verse eid="GEN 1:1"/>
+  <verse number="2" style="v" sid="GEN 1:2"/>He called it <char style="add">day</char>.<note caller="+" style="x"><char style="xo">1:2 </char><ref loc="GEN 1:5">1:5</ref></note>
+</para>
+<para style="q1">Then he said, “It is good.”<verse eid="GEN 1:2"/></para>
+<chapter eid="GEN 1"/>
+</usx>"""
+
+def parse_chapter():
+    chapter = list(USXParser(book_usx).chapters())[0]
+    paragraphs = [
+        (paragraph_id, para.xml, para.text if versetext_styles[para.style] else "")
+        for paragraph_id, para in enumerate(chapter.paragraphs, start=1)
+    ]
+    verse_texts = {verse.verse_ref: verse.getText(versetext_styles) for verse in chapter.verses}
+    return paragraphs, verse_texts
+
+def quote_tokens(chapter_text):
+    # Stand-ins for the spaCy tokens of the quote marks, createQuoteOccurence only reads text and idx
+    return [SimpleNamespace(text=char, idx=idx) for idx, char in enumerate(chapter_text) if char in "“”"]
+
+def test_quote_offsets_point_into_the_verse_text():
+    paragraphs, verse_texts = parse_chapter()
+    chapter_text, spans, notes = build_chapter_text(paragraphs)
+    assert len(notes) == 2
+
+    tokens = quote_tokens(chapter_text)
+    token_spans = map_spans([token.idx for token in tokens], spans)
+
+    verse_occ_ids = {"GEN 1:1": 11, "GEN 1:2": 12}
+    chapter = TokenChapter(1, "GEN", 1, "GEN 1", spans, notes, verse_occ_ids)
+    stage = TokenStage.__new__(TokenStage)
+
+    occurences = []
+    for occurence_id, (token, token_span) in enumerate(zip(tokens, token_spans), start=1):
+        stage.createQuoteOccurence(occurences, occurence_id, chapter, token, token_span)
+
+    # GEN 1:1 has a footnote before its quote, GEN 1:2 quotes in the second paragraph it runs through
+    assert [(occurence[3], occurence[1]) for occurence in occurences] == [(11, "“"), (11, "”"), (12, "“"), (12, "”")]
+    for occurence_id, text, occurence_type, verse_occ_id, start_char, end_char, paragraph_id in occurences:
+        verse_ref = "GEN 1:1" if verse_occ_id == 11 else "GEN 1:2"
+        assert verse_texts[verse_ref][start_char:end_char] == text
+
+def test_text_after_a_note_keeps_its_verse_offsets():
+    paragraphs, verse_texts = parse_chapter()
+    chapter_text, spans, notes = build_chapter_text(paragraphs)
+
+    # Every character of verse text maps back to the same character in the verse
+    for start, end, paragraph_id, verse_ref, verse_start in spans:
+        if verse_start == None:
+            continue
+        for offset, char in enumerate(chapter_text[start:end]):
+            if not char.isspace():
+                assert verse_texts[verse_ref][verse_start + offset] == char
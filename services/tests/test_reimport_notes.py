@@ -0,0 +1,80 @@
+from bookcheckpoints import clear_book
+from miniousxupload import MinioUSXUpload
+from tokenstage import TokenStage, TokenChapter
+
+def create_file(cur, file_path):
+    cur.execute("""
+        INSERT INTO bible.files (etag, type, file_path, bucket) VALUES (%s, %s, %s, %s) RETURNING id;
+    """, (file_path, "application/xml", file_path, "test"))
+    return cur.fetchone()[0]
+
+def count_notes(cur, file_ids):
+    cur.execute("""
+        SELECT (SELECT count(*) FROM bible.translationfootnotes WHERE file_id = ANY(%s))
+             + (SELECT count(*) FROM bible.translationrefnotes WHERE file_id = ANY(%s));
+    """, (file_ids, file_ids))
+    return cur.fetchone()[0]
+
+def import_book_with_notes(cur):
+    # A translation with GEN imported from revision 1, with a footnote and a cross reference
+    cur.execute("""
+        INSERT INTO bible.translations (revision) VALUES (1) RETURNING id;
+    """)
+    translation_id = cur.fetchone()[0]
+    old_file_id = create_file(cur, "test/1/GEN.usx")
+
+    cur.execute("""
+        INSERT INTO bible.booktofile (book_code, translation_id, file_id, short, long) VALUES ('GEN', %s, %s, 'Genesis', 'Genesis') RETURNING id;
+    """, (translation_id, old_file_id))
+    book_map_id = cur.fetchone()[0]
+
+    cur.execute("""
+        INSERT INTO bible.translationfootnotes (file_id, xml, text) VALUES (%s, '<note style="f"/>', 'Or perfect');
+    """, (old_file_id,))
+    cur.execute("""
+        INSERT INTO bible.translationrefnotes (file_id, xml) VALUES (%s, '<note style="x"/>');
+    """, (old_file_id,))
+
+    return translation_id, book_map_id, old_file_id
+
+def reimport_book(cur, translation_id, file_path):
+    # MinioUSXUpload.get_book_map without an import around it, only the cursor and translation are used
+    upload = MinioUSXUpload.__new__(MinioUSXUpload)
+    upload.cur = cur
+    upload.translation_id = translation_id
+
+    new_file_id = create_file(cur, file_path)
+    return upload.get_book_map("GEN", new_file_id, "Genesis", "Genesis"), new_file_id
+
+def test_clear_book_removes_notes_of_the_previous_file(db):
+    cur = db.cursor()
+    translation_id, book_map_id, old_file_id = import_book_with_notes(cur)
+
+    reimported_map_id, new_file_id = reimport_book(cur, translation_id, "test/2/GEN.usx")
+    assert reimported_map_id == book_map_id
+
+    clear_book(cur, translation_id, "GEN")
+    assert count_notes(cur, [old_file_id, new_file_id]) == 0
+
+def test_token_stage_replaces_notes_of_the_previous_file(db):
+    cur = db.cursor()
+    translation_id, book_map_id, old_file_id = import_book_with_notes(cur)
+
+    reimported_map_id, new_file_id = reimport_book(cur, translation_id, "test/2/GEN.usx")
+
+    # TokenStage.clearBook only needs the cursor
+    stage = TokenStage.__new__(TokenStage)
+    stage.cur = cur
+    stage.clearBook(TokenChapter(reimported_map_id, "GEN", new_file_id, "GEN 1", [], [], {}))
+
+    assert count_notes(cur, [old_file_id, new_file_id]) == 0
+
+def test_unchanged_book_keeps_its_notes(db):
+    cur = db.cursor()
+    translation_id, book_map_id, old_file_id = import_book_with_notes(cur)
+
+    # An unchanged book is only pointed at its copy in the new revision, nothing clears it
+    book_map_id, new_file_id = reimport_book(cur, translation_id, "test/2/GEN.usx")
+
+    assert count_notes(cur, [old_file_id]) == 0
+    assert count_notes(cur, [new_file_id]) == 2
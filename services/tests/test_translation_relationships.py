@@ -0,0 +1,33 @@
+from bs4 import BeautifulSoup
+
+from miniousxupload import MinioUSXUpload
+
+metadata = """<DBLMetadata revision="4">
+<relationships><relation id="12345" revision="2" type="text" relationType="source"/></relationships>
+</DBLMetadata>"""
+
+def test_rerun_replaces_relationships_of_its_revision(db):
+    cur = db.cursor()
+    cur.execute("""
+        INSERT INTO bible.translationinfo (dbl_id) VALUES ('test-relationships');
+    """)
+    # Revision 3 was imported before, its relationships are kept
+    cur.execute("""
+        INSERT INTO bible.translationrelationships (from_translation, from_revision, to_translation, to_revision, type)
+        VALUES ('test-relationships', 3, 12345, 1, 'source');
+    """)
+
+    upload = MinioUSXUpload.__new__(MinioUSXUpload)
+    upload.cur = cur
+    upload.dbl_id = "test-relationships"
+    upload.revision = "4"
+
+    metadata_xml = BeautifulSoup(metadata, "xml")
+    upload.create_translation_relationships(metadata_xml)
+    upload.create_translation_relationships(metadata_xml)
+
+    cur.execute("""
+        SELECT from_revision, to_revision FROM bible.translationrelationships
+        WHERE from_translation = 'test-relationships' ORDER BY from_revision;
+    """)
+    assert cur.fetchall() == [(3, 1), (4, 2)]
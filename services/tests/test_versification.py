@@ -0,0 +1,24 @@
+from miniousxupload import MinioUSXUpload
+
+def count_verses(cur, chapter_ref):
+    cur.execute("""
+        SELECT count(*) FROM bible.verses WHERE chapter_ref = %s;
+    """, (chapter_ref,))
+    return cur.fetchone()[0]
+
+def test_verses_listed_twice_are_added_once(db):
+    cur = db.cursor()
+    # Verses nothing imported references yet, so the test can add them again
+    cur.execute("""
+        DELETE FROM bible.verses WHERE chapter_ref = 'OBA 1' AND verse_ref NOT IN (
+            SELECT verse_ref FROM bible.verseoccurences UNION SELECT verse_ref FROM bible.versestoparagraphs
+            UNION SELECT verse_ref FROM bible.excludedverses
+        );
+    """)
+
+    upload = MinioUSXUpload.__new__(MinioUSXUpload)
+    upload.cur = cur
+    upload.book_codes = {"OBA"}
+    upload.createVerses("OBA 1:21\nOBA 1:21")
+
+    assert count_verses(cur, "OBA 1") == 21